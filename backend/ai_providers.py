@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import random
+import google.generativeai as genai
+from dotenv import load_dotenv
+from typing import List, Optional
+
+load_dotenv()
+
+# --- Provider Selection ---
+# 'gemini' (default) talks to Google; 'fake' is an offline stand-in for load tests
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
+
+
+class GeminiProvider:
+    """
+    The real backend: google.generativeai, with blocking File API calls moved to worker threads.
+    """
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], params: dict):
+        self.api_key = api_key
+        self.params = params
+        genai.configure(api_key=api_key)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    async def generate(self, model_name: str, contents, kind: str = "chat", stream: bool = False):
+        model = genai.GenerativeModel(model_name, **self.params)
+        return await model.generate_content_async(contents, stream=stream)
+
+    async def upload_file(self, path: str, mime_type: str):
+        return await asyncio.to_thread(genai.upload_file, path=path, mime_type=mime_type)
+
+    async def get_file(self, name: str):
+        return await asyncio.to_thread(genai.get_file, name)
+
+    async def delete_file(self, name: str):
+        await asyncio.to_thread(genai.delete_file, name)
+
+
+# --- Fake Provider (offline load testing) ---
+
+FAKE_RESPONSES = {
+    "chat": "Great question! Every small eco-action adds up, so keep completing your daily tasks to earn EcoCoins. 🌱",
+    "verify": {"valid": True, "reason": "Fake provider: the media matches the task."},
+    "scan": {
+        "object_name": "Aluminum Soda Can",
+        "recycling_protocol": "Rinse it and place it in the metal recycling bin.",
+        "eco_fact": "Recycling one aluminum can saves enough energy to run a TV for three hours.",
+        "points": 10,
+    },
+}
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, chunks: List[str], chunk_delay: float):
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(self.chunk_delay)
+            yield FakeResponse(chunk)
+
+
+class FakeFile:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = type("State", (), {"name": "ACTIVE"})()
+
+
+class FakeProvider:
+    """
+    Deterministic offline provider with configurable latency and failure injection:
+
+    FAKE_AI_LATENCY     'fixed:200', 'uniform:50-400' or 'lognormal:200,0.5' (milliseconds;
+                        lognormal takes the median and sigma)
+    FAKE_AI_ERROR_RATE  probability of a generic upstream error (0-1)
+    FAKE_AI_QUOTA_RATE  probability of a 429 quota error (0-1)
+    FAKE_AI_RESPONSES   optional JSON file overriding the canned 'chat' / 'verify' / 'scan' outputs
+    FAKE_AI_SEED        random seed, so a run's latencies and failures are reproducible
+    """
+    name = "fake"
+    available = True
+
+    def __init__(self):
+        self.latency = os.getenv("FAKE_AI_LATENCY", "uniform:100-300")
+        self.error_rate = float(os.getenv("FAKE_AI_ERROR_RATE", 0))
+        self.quota_rate = float(os.getenv("FAKE_AI_QUOTA_RATE", 0))
+        self.rng = random.Random(int(os.getenv("FAKE_AI_SEED", 42)))
+        self.responses = dict(FAKE_RESPONSES)
+        responses_file = os.getenv("FAKE_AI_RESPONSES")
+        if responses_file:
+            with open(responses_file) as f:
+                self.responses.update(json.load(f))
+        self.calls = 0
+
+    def _latency_seconds(self) -> float:
+        kind, _, spec = self.latency.partition(":")
+        if kind == "fixed":
+            ms = float(spec)
+        elif kind == "uniform":
+            low, high = (float(x) for x in spec.split("-"))
+            ms = self.rng.uniform(low, high)
+        elif kind == "lognormal":
+            median, sigma = (float(x) for x in spec.split(","))
+            ms = self.rng.lognormvariate(0, sigma) * median
+        else:
+            raise ValueError(f"Unknown FAKE_AI_LATENCY: {self.latency}")
+        return ms / 1000
+
+    def _canned_text(self, kind: str) -> str:
+        response = self.responses.get(kind, self.responses["chat"])
+        return response if isinstance(response, str) else json.dumps(response)
+
+    async def generate(self, model_name: str, contents, kind: str = "chat", stream: bool = False):
+        self.calls += 1
+        latency = self._latency_seconds()
+        roll = self.rng.random()
+
+        if roll < self.quota_rate:
+            await asyncio.sleep(latency / 4)
+            raise Exception(f"429 Resource has been exhausted (e.g. check quota) [fake {model_name}]")
+        if roll < self.quota_rate + self.error_rate:
+            await asyncio.sleep(latency / 2)
+            raise Exception(f"503 The service is currently unavailable [fake {model_name}]")
+
+        text = self._canned_text(kind)
+        if stream:
+            words = text.split(" ")
+            chunks = [" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+            return FakeStream(chunks, latency / max(len(chunks), 1))
+
+        await asyncio.sleep(latency)
+        return FakeResponse(text)
+
+    async def upload_file(self, path: str, mime_type: str):
+        await asyncio.sleep(self._latency_seconds())
+        return FakeFile(f"files/fake-{self.rng.getrandbits(32):08x}")
+
+    async def get_file(self, name: str):
+        return FakeFile(name)
+
+    async def delete_file(self, name: str):
+        return None
+
+
+def get_provider(api_key: Optional[str], params: dict):
+    if AI_PROVIDER == "fake":
+        print("🧪 Using FAKE AI provider (offline, no quota used).")
+        return FakeProvider()
+    return GeminiProvider(api_key, params)
@@ -1,20 +1,25 @@
 import os
+import asyncio
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
-import time
-from PIL import Image
 import io
+from model_router import ModelRouter, AllModelsFailedError, LoadShedError, is_quota_error
+from quota_governor import PRIORITY_CHAT, PRIORITY_SCANNER, PRIORITY_VERIFICATION
+from verification_cache import VerificationCache, make_key
+from singleflight import SingleFlight
+from image_pipeline import prepare_image_async
+from uploads import SpooledUpload
+import video_frames
+import ai_providers
 
 # 1. Load Environment Variables
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-if not GOOGLE_API_KEY:
+if not GOOGLE_API_KEY and ai_providers.AI_PROVIDER == "gemini":
     print("CRITICAL WARNING: GOOGLE_API_KEY is missing from .env file.")
 
-genai.configure(api_key=GOOGLE_API_KEY)
-
 # --- SMART MODEL SELECTION ---
 
 def get_model():
@@ -41,7 +46,6 @@ def get_model():
         try:
             return genai.GenerativeModel(model_name, **params)
         except Exception:
-            time.sleep(1)
             continue
             
     # Default fallback
@@ -66,6 +70,9 @@ YOUR RESPONSIBILITIES:
 Do not answer questions unrelated to the environment, nature, or the EcoLoop app.
 """
 
+CHAT_QUOTA_MESSAGE = "I'm feeling a bit overwhelmed right now (Rate Limit Reached)! 🌿 But remember: Every small action counts. Try asking me again in a minute!"
+CHAT_OFFLINE_MESSAGE = "I'm having trouble connecting to the nature network right now. Try again later! 🌱"
+
 # --- FUNCTIONS ---
 
 # Config for generation
@@ -87,43 +94,106 @@ models_to_try = [
     'models/gemini-pro-latest'
 ]
 
+# Backend behind every model call: Gemini, or the offline fake (AI_PROVIDER=fake)
+provider = ai_providers.get_provider(GOOGLE_API_KEY, params)
+
+# Shared failover router: per-model circuit breakers + async backoff
+router = ModelRouter(models_to_try)
+
+# Verdicts keyed by hash(upload bytes) + task label, so resubmissions skip Gemini
+verification_cache = VerificationCache()
+
+# Identical concurrent requests share one outbound Gemini call
+chat_flight = SingleFlight("Chat")
+verify_flight = SingleFlight("Verification")
+scanner_flight = SingleFlight("Scanner")
+
 async def get_chat_response(user_message: str):
     """
     Handles chat interactions for the EcoBot interface with robust failover.
+    Concurrent identical questions are coalesced into one model call.
     """
+    flight_key = " ".join(user_message.lower().split())
+    response = await chat_flight.do(flight_key, lambda: _get_chat_response(user_message))
+    return dict(response)
+
+async def _get_chat_response(user_message: str):
     full_prompt = f"{ECOLOOP_SYSTEM_PROMPT}\n\nUser: {user_message}\nEcoBot:"
-    
-    quota_error_hit = False
 
-    for model_name in models_to_try:
-        try:
-            print(f"DEBUG: Trying Chat with model: {model_name}")
-            model = genai.GenerativeModel(model_name, **params)
-            response = await model.generate_content_async(full_prompt)
-            return {"response": response.text}
-        except Exception as e:
-            error_str = str(e)
-            print(f"⚠️ Model {model_name} failed: {e}")
-            if "429" in error_str or "quota" in error_str.lower():
-                quota_error_hit = True
-            time.sleep(1)
-            continue # Try next model
-
-    # If all fail
-    print("❌ All AI models failed.")
-    
+    async def call(model_name):
+        response = await provider.generate(model_name, full_prompt, kind="chat")
+        return {"response": response.text}
+
+    try:
+        return await router.run(call, label="Chat", priority=PRIORITY_CHAT)
+    except AllModelsFailedError as e:
+        # Local sheds get the same "busy" reply as provider quota errors
+        quota_error_hit = e.quota_error_hit or isinstance(e, LoadShedError)
+
     if quota_error_hit:
-        return {
-            "response": "I'm feeling a bit overwhelmed right now (Rate Limit Reached)! 🌿 But remember: Every small action counts. Try asking me again in a minute!"
-        }
+        return {"response": CHAT_QUOTA_MESSAGE}
         
-    return {"response": "I'm having trouble connecting to the nature network right now. Try again later! 🌱"}
+    return {"response": CHAT_OFFLINE_MESSAGE}
+
+def _chunk_text(chunk) -> str:
+    # Chunks without text parts (e.g. the final finish_reason chunk) raise on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+async def stream_chat_response(user_message: str):
+    """
+    Streams the EcoBot reply as text chunks arrive from Gemini.
+    Failover happens before the first chunk; once text has been sent, a
+    mid-stream error is raised to the caller instead of switching models.
+    """
+    full_prompt = f"{ECOLOOP_SYSTEM_PROMPT}\n\nUser: {user_message}\nEcoBot:"
 
-async def verify_task_content(file_path: str, mime_type: str, task_tag: str) -> dict:
+    async def open_stream(model_name):
+        response = await provider.generate(model_name, full_prompt, kind="chat", stream=True)
+        chunks = response.__aiter__()
+        # Pull chunks until the first one with text so an empty/failed stream still fails over
+        while True:
+            try:
+                first_text = _chunk_text(await chunks.__anext__())
+            except StopAsyncIteration:
+                raise Exception("Empty response from AI")
+            if first_text:
+                return first_text, chunks
+
+    try:
+        first_text, chunks = await router.run(open_stream, label="Chat Stream", priority=PRIORITY_CHAT)
+    except AllModelsFailedError as e:
+        yield CHAT_QUOTA_MESSAGE if e.quota_error_hit or isinstance(e, LoadShedError) else CHAT_OFFLINE_MESSAGE
+        return
+
+    yield first_text
+    async for chunk in chunks:
+        text = _chunk_text(chunk)
+        if text:
+            yield text
+
+def _holding_upload(upload: SpooledUpload, make_call):
+    """
+    Starts a flight's shared call with the upload held: the request that started
+    the flight may finish (and clean up) while joined callers still wait on it,
+    so the spooled data is only released once the shared call completes.
+    """
+    upload.hold()
+
+    async def run():
+        try:
+            return await make_call()
+        finally:
+            upload.release()
+    return run()
+
+async def verify_task_content(upload: SpooledUpload, task_tag: str) -> dict:
     """
     Verifies if the uploaded content (Image or Video) matches the required task using Gemini.
     """
-    if not GOOGLE_API_KEY:
+    if not provider.available:
         print("WARNING: GEMINI_API_KEY not found. Returning Mock Success.")
         return {
             "is_valid": True, 
@@ -131,96 +201,148 @@ async def verify_task_content(file_path: str, mime_type: str, task_tag: str) ->
             "confidence": 1.0
         }
 
+    cache_key = make_key(upload.digest, task_tag)
+    cached = await verification_cache.get(cache_key)
+    if cached is not None:
+        print(f"DEBUG: Verification cache hit for '{task_tag}'")
+        return {**cached, "cached": True}
+
+    # Double-tapped uploads of the same media verify once
+    verdict = await verify_flight.do(
+        cache_key, lambda: _holding_upload(upload, lambda: _verify_task_content(upload, task_tag, cache_key))
+    )
+    return dict(verdict)
+
+async def _upload_video(upload: SpooledUpload):
+    """
+    Uploads a video to the Gemini File API once and waits (asynchronously) until it is ready.
+    """
+    print(f"DEBUG: Uploading video to Gemini File API: {upload.filename}")
+    video_file = await provider.upload_file(upload.path, upload.content_type)
+
+    attempt = 0
+    while video_file.state.name == "PROCESSING":
+        await asyncio.sleep(1)
+        video_file = await provider.get_file(video_file.name)
+        attempt += 1
+        if attempt > 30: # Timeout
+            raise Exception("Video processing timeout")
+
+    if video_file.state.name == "FAILED":
+        raise Exception("Video processing failed at Google Gemini backend.")
+    return video_file
+
+async def _delete_uploaded_video(video_file):
+    try:
+        await provider.delete_file(video_file.name)
+    except Exception as e:
+        print(f"⚠️ Could not delete uploaded video {video_file.name}: {e}")
+
+async def _verify_task_content(upload: SpooledUpload, task_tag: str, cache_key: str) -> dict:
     prompt = f"Analyze this media (could be image or video). Does it show {task_tag}? Answer ONLY with a JSON object: {{ 'valid': boolean, 'reason': string }}."
     
-    last_error = None
-    quota_error_hit = False
-
-    for model_name in models_to_try:
+    media_parts = None
+    if upload.is_video:
+        # Preferred: a handful of local keyframes verified as images in one batched call
+        media_parts = await video_frames.extract_keyframes(upload.path)
+        if media_parts:
+            prompt = f"These {len(media_parts)} images are frames sampled in order from one video. Does the video show {task_tag}? Answer ONLY with a JSON object: {{ 'valid': boolean, 'reason': string }}."
+    else:
+        # Downscale/strip once, before failover, so every model gets the same small upload
         try:
-            print(f"DEBUG: Verifying with model: {model_name}")
-            model = genai.GenerativeModel(model_name, **params)
-
-            if mime_type.startswith('video/'):
-                # Video processing
-                print(f"DEBUG: Processing video with Gemini File API with {model_name}: {file_path}")
-                
-                # Upload the file (Do this only once if possible, but for simplicity here we assume re-upload or reuse)
-                video_file = genai.upload_file(path=file_path, mime_type=mime_type)
-                
-                # Wait for processing
-                attempt = 0
-                while video_file.state.name == "PROCESSING":
-                    print(".", end="", flush=True)
-                    time.sleep(1)
-                    video_file = genai.get_file(video_file.name)
-                    attempt += 1
-                    if attempt > 30: # Timeout
-                        raise Exception("Video processing timeout")
-
-                if video_file.state.name == "FAILED":
-                    raise Exception("Video processing failed at Google Gemini backend.")
-
-                response = await model.generate_content_async([prompt, video_file])
-            else:
-                # Image processing
-                image = Image.open(file_path)
-                response = await model.generate_content_async([prompt, image])
-
-            if not response or not hasattr(response, 'text'):
-                 raise Exception("Empty response from AI")
-
-            text = response.text.replace('```json', '').replace('```', '').strip()
-            
+            media_parts = [(await prepare_image_async(upload.source)).as_part()]
+        except Exception as e:
+            print(f"⚠️ Could not read uploaded image: {e}")
+            return {
+                "verified": False,
+                "is_valid": False,
+                "message": "Could not read the uploaded image. Please try a JPG or PNG photo.",
+                "confidence": 0.0
+            }
+
+    async def call(model_name):
+        response = await provider.generate(model_name, [prompt, *media_parts], kind="verify")
+
+        if not response or not hasattr(response, 'text'):
+             raise Exception("Empty response from AI")
+
+        return response.text
+
+    video_file = None
+    try:
+        if media_parts is None:
+            # Full-file mode: upload once and reuse the same handle for every model in the failover list
             try:
-                result = json.loads(text)
-                return {
-                    "verified": result.get("valid", False),
-                    "is_valid": result.get("valid", False),
-                    "message": result.get("reason", "Analysis complete."),
-                    "confidence": 0.95 
-                }
-            except json.JSONDecodeError:
-                is_valid = "true" in text.lower() or "yes" in text.lower()
-                return {
-                    "verified": is_valid,
-                    "is_valid": is_valid,
-                    "message": text,
-                    "confidence": 0.8
-                }
+                video_file = await _upload_video(upload)
+            except Exception as e:
+                raise AllModelsFailedError(str(e), is_quota_error(e))
+            media_parts = [video_file]
+
+        raw_text = await router.run(call, label="Verification", priority=PRIORITY_VERIFICATION)
+    except LoadShedError:
+        # Our own budget ran out: never approve without a model verdict
+        return {
+            "verified": False,
+            "is_valid": False,
+            "busy": True,
+            "message": "The AI verifier is busy right now. Please try again in a minute.",
+            "confidence": 0.0
+        }
+    except AllModelsFailedError as e:
+        # If all failed
+        if e.quota_error_hit:
+             print("⚠️ Quota Exceeded. Falling back to 'Success' for developer experience.")
+             return {
+                "verified": True,
+                "is_valid": True,
+                "message": "AI Quota Exceeded. (Developer Mode: Verification Bypassed so you can proceed!) 🌿",
+                "confidence": 1.0
+            }
 
-        except Exception as e:
-            error_msg = str(e)
-            print(f"⚠️ Verification Model {model_name} failed: {error_msg}")
-            last_error = error_msg
-            if "429" in error_msg or "quota" in error_msg.lower():
-                quota_error_hit = True
-            
-            time.sleep(1)
-            # If video was uploaded, we might leave it. It's fine for now.
-            continue
-            
-    # If all failed
-    if quota_error_hit:
-         print("⚠️ Quota Exceeded. Falling back to 'Success' for developer experience.")
-         return {
-            "verified": True,
-            "is_valid": True,
-            "message": "AI Quota Exceeded. (Developer Mode: Verification Bypassed so you can proceed!) 🌿",
-            "confidence": 1.0
+        return {
+            "verified": False,
+            "is_valid": False, 
+            "message": f"AI Error: {e.last_error}", 
+            "confidence": 0.0
         }
+    finally:
+        if video_file is not None:
+            await _delete_uploaded_video(video_file)
 
-    return {
-        "verified": False,
-        "is_valid": False, 
-        "message": f"AI Error: {last_error}", 
-        "confidence": 0.0
-    }
+    text = raw_text.replace('```json', '').replace('```', '').strip()
+    
+    try:
+        result = json.loads(text)
+        verdict = {
+            "verified": result.get("valid", False),
+            "is_valid": result.get("valid", False),
+            "message": result.get("reason", "Analysis complete."),
+            "confidence": 0.95 
+        }
+    except json.JSONDecodeError:
+        is_valid = "true" in text.lower() or "yes" in text.lower()
+        verdict = {
+            "verified": is_valid,
+            "is_valid": is_valid,
+            "message": text,
+            "confidence": 0.8
+        }
+
+    # Only real model verdicts are cached; quota bypasses and errors must be retried
+    await verification_cache.set(cache_key, verdict)
+    return {**verdict, "cached": False}
 
-async def analyze_eco_object(file_path: str, mime_type: str) -> dict:
+async def analyze_eco_object(upload: SpooledUpload) -> dict:
     """
     Identifies an object and provides its recycling protocol, an eco-fact, and assigns points.
+    Concurrent scans of the same image are coalesced into one model call.
     """
+    result = await scanner_flight.do(
+        upload.digest, lambda: _holding_upload(upload, lambda: _analyze_eco_object(upload))
+    )
+    return dict(result)
+
+async def _analyze_eco_object(upload: SpooledUpload) -> dict:
     prompt = """
     Analyze this image in high detail. Identify the main object and provide:
     1. 'object_name': A specific name for the object (e.g., 'Aluminum Soda Can', 'Cardboard Pizza Box').
@@ -231,37 +353,39 @@ async def analyze_eco_object(file_path: str, mime_type: str) -> dict:
     CRITICAL: Return ONLY a valid JSON object. No preamble, no markdown formatting.
     """
 
-    last_error = "All models failed"
-    for model_name in models_to_try:
+    quota_error_hit = False
+    try:
+        image_part = (await prepare_image_async(upload.source)).as_part()
+    except Exception as e:
+        print(f"⚠️ Could not read scanner image: {e}")
+        image_part = None
+
+    async def call(model_name):
+        response = await provider.generate(model_name, [prompt, image_part], kind="scan")
+
+        if not response or not hasattr(response, 'text'):
+             raise Exception("Empty response from AI")
+
+        text = response.text.replace('```json', '').replace('```', '').strip()
+        # Clean up potential leading/trailing non-json chars
+        if text.startswith('{'):
+            return json.loads(text)
+        else:
+            # Try to extract JSON if there's any text around it
+            start = text.find('{')
+            end = text.rfind('}') + 1
+            if start != -1 and end != -1:
+                return json.loads(text[start:end])
+            raise Exception(f"No valid JSON found in response: {text[:100]}...")
+
+    if image_part is not None:
         try:
-            print(f"DEBUG: Scanning Eco-Object with model: {model_name}")
-            model = genai.GenerativeModel(model_name, **params)
-            image = Image.open(file_path)
-            response = await model.generate_content_async([prompt, image])
-
-            if not response or not hasattr(response, 'text'):
-                 raise Exception("Empty response from AI")
-
-            text = response.text.replace('```json', '').replace('```', '').strip()
-            # Clean up potential leading/trailing non-json chars
-            if text.startswith('{'):
-                return json.loads(text)
-            else:
-                # Try to extract JSON if there's any text around it
-                start = text.find('{')
-                end = text.rfind('}') + 1
-                if start != -1 and end != -1:
-                    return json.loads(text[start:end])
-                raise Exception(f"No valid JSON found in response: {text[:100]}...")
-            
-        except Exception as e:
-            print(f"⚠️ Scanner Model {model_name} failed: {e}")
-            last_error = str(e)
-            time.sleep(1)
-            continue
+            return await router.run(call, label="Scanner", priority=PRIORITY_SCANNER)
+        except AllModelsFailedError as e:
+            quota_error_hit = e.quota_error_hit or isinstance(e, LoadShedError)
 
     # Fallback if AI fails (Provide a slightly better specific message if it's a quota issue)
-    if "429" in last_error or "quota" in last_error.lower():
+    if quota_error_hit:
          return {
             "object_name": "Slightly Overwhelmed AI",
             "recycling_protocol": "I'm currently receiving too many requests! However, most household items like bottles and paper can be recycled in your blue bin. Try again in a minute!",
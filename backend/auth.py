@@ -1,9 +1,17 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import database, models, schemas
 
@@ -12,7 +20,29 @@ SECRET_KEY = "supersecretkey_ecoloop_hackathon_demo"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 1 day for demo convenience
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Authenticated principals are cached this long, so most requests skip the user lookup
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 30))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+
+# --- Password Hashing Configuration ---
+# Argon2 cost (defaults match passlib's: 64 MiB, 3 passes, 4 lanes). Each in-flight hash
+# holds ARGON2_MEMORY_COST KiB, so memory use peaks at roughly workers x memory cost.
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+# Dedicated threads for hashing, so a login burst can't starve the shared threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+# Hashes allowed to wait for a worker before new logins get 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="argon2")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 # --- Hashing Utilities ---
@@ -22,6 +52,34 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Runs Argon2 on `password_executor` and rejects work (503) once too many hashes are queued.
+    """
+    def __init__(self, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.max_pending = max_pending
+        self.pending = 0
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(status_code=503, detail="Too many sign-in attempts right now. Please retry shortly.")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str):
+        """
+        (is_valid, new_hash): new_hash is set when the stored hash used older Argon2 parameters.
+        """
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+password_hasher = PasswordHasher()
+
 # --- JWT Utilities ---
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -34,22 +92,146 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # --- Dependency: Get Current User ---
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(username=username)
+            raise credentials_exception()
+        schemas.TokenData(username=username)
     except JWTError:
-        raise credentials_exception
-        
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+        raise credentials_exception()
+    return payload
+
+def username_from_token(token: str) -> str:
+    return decode_token(token)["sub"]
+
+# --- Principal Cache ---
+
+class Principal:
+    """
+    Lightweight snapshot of an authenticated user plus the token's decoded claims.
+    Enough for routes that only need to know who is calling; routes that read
+    relationships or change the user still load the live row (get_current_user).
+    """
+    __slots__ = ("id", "username", "email", "coins", "streak", "profile_image", "claims", "expires_at")
+
+    def __init__(self, user: models.User, claims: dict):
+        self.id = user.id
+        self.username = user.username
+        self.email = user.email
+        self.coins = user.coins
+        self.streak = user.streak
+        self.profile_image = user.profile_image
+        self.claims = claims
+        # Never outlive the token itself
+        self.expires_at = min(time.time() + PRINCIPAL_CACHE_TTL_SECONDS, claims.get("exp", float("inf")))
+
+class PrincipalCache:
+    """
+    Token -> Principal LRU with a short TTL. `invalidate(username)` drops every
+    cached token for that user; call it after coins, streak or profile change.
+    """
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Principal]:
+        with self._lock:
+            principal = self._entries.get(token)
+            if principal is None or principal.expires_at <= time.time():
+                if principal is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal):
+        with self._lock:
+            self._entries[token] = principal
+            self._entries.move_to_end(token)
+            self._tokens_by_user.setdefault(principal.username, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, username: str):
+        with self._lock:
+            for token in self._tokens_by_user.pop(username, set()):
+                self._entries.pop(token, None)
+
+    def _remove(self, token: str):
+        principal = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal.username]
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+principal_cache = PrincipalCache()
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    username = username_from_token(token)
+    user = db.query(models.User).filter(models.User.username == username).first()
+    if user is None:
+        raise credentials_exception()
+    return user
+
+def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)) -> Principal:
+    """
+    Who is calling, from the principal cache when possible (no JWT decode, no DB query).
+    """
+    principal = principal_cache.get(token)
+    if principal is None:
+        claims = decode_token(token)
+        user = db.query(models.User).filter(models.User.username == claims["sub"]).first()
+        if user is None:
+            raise credentials_exception()
+        principal = Principal(user, claims)
+        principal_cache.put(token, principal)
+    return principal
+
+async def get_current_principal_async(token: str = Depends(oauth2_scheme)) -> Principal:
+    """
+    Async variant of get_current_principal; only opens a session on a cache miss.
+    """
+    principal = principal_cache.get(token)
+    if principal is None:
+        claims = decode_token(token)
+        async with database.AsyncSessionLocal() as db:
+            result = await db.execute(select(models.User).where(models.User.username == claims["sub"]))
+            user = result.scalars().first()
+        if user is None:
+            raise credentials_exception()
+        principal = Principal(user, claims)
+        principal_cache.put(token, principal)
+    return principal
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Same as get_current_user, for async routes using database.get_async_db.
+    The user is attached to the route's AsyncSession (FastAPI shares the dependency per request).
+    """
+    username = username_from_token(token)
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    user = result.scalars().first()
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    # End the read so the pooled connection isn't held while the route awaits AI calls
+    await db.commit()
     return user
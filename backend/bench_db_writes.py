@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+
+import coins
+import database
+import models
+
+# Compares concurrent write throughput of the old SQLite defaults (rollback journal,
+# synchronous=FULL, no busy_timeout) against the tuned engine from database.build_engine.
+# Each operation mirrors /users/progress: load a user, credit coins (atomic UPDATE plus a
+# coin_ledger row, via coins.credit), upsert a progress row, commit once.
+#
+#   python bench_db_writes.py --threads 16 --ops 2000
+
+
+def seed(engine, users: int):
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([models.Level(id=i, title=f"Level {i}", order=i) for i in range(1, 6)])
+        db.add_all([models.User(username=f"bench{i}", email=f"bench{i}@example.com", coins=0) for i in range(users)])
+        db.commit()
+
+
+def write_op(Session, users: int, attempts: int = 3):
+    user_id = random.randint(1, users)
+    level_id = random.randint(1, 5)
+    with Session() as db:
+        for attempt in range(attempts):
+            try:
+                user = db.get(models.User, user_id)
+                coins.credit(db, user, 10, "bench")
+                progress = db.query(models.UserProgress).filter(
+                    models.UserProgress.user_id == user.id,
+                    models.UserProgress.level_id == level_id,
+                ).first()
+                if progress:
+                    progress.score += 1
+                else:
+                    db.add(models.UserProgress(user_id=user.id, level_id=level_id, status="unlocked"))
+                db.commit()
+                return
+            except IntegrityError:
+                # Like /users/progress: another thread created the row first, so retry as an update
+                db.rollback()
+                if attempt == attempts - 1:
+                    raise
+
+
+def run(label: str, tuned: bool, threads: int, ops: int, users: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = database.build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tuned=tuned)
+        seed(engine, users)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        locked = conflicts = 0
+        def task(_):
+            nonlocal locked, conflicts
+            try:
+                write_op(Session, users)
+            except IntegrityError:
+                # Unique (user_id, level_id) race that outlasted write_op's retries
+                conflicts += 1
+            except OperationalError:
+                # "database is locked" once the sqlite3 busy timeout runs out
+                locked += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(task, range(ops)))
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    print(f"{label:<10} {ops / elapsed:8.0f} writes/s  ({elapsed:.2f}s, {locked} locked, {conflicts} unique conflicts)")
+    return ops / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite write throughput: default vs tuned engine")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.ops} progress updates from {args.threads} threads:")
+    baseline = run("default", False, args.threads, args.ops, args.users)
+    tuned = run("tuned", True, args.threads, args.ops, args.users)
+    print(f"Speedup: {tuned / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
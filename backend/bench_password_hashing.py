@@ -0,0 +1,58 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+import auth
+
+# Measures Argon2 login (verify) throughput for the configured cost, or for candidate
+# settings, so ARGON2_MEMORY_COST / ARGON2_TIME_COST can be picked per deployment:
+#
+#   python bench_password_hashing.py
+#   python bench_password_hashing.py --memory-cost 19456 --time-cost 2 --parallelism 1
+
+
+def make_context(memory_cost: int, time_cost: int, parallelism: int) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        argon2__memory_cost=memory_cost,
+        argon2__time_cost=time_cost,
+        argon2__parallelism=parallelism,
+    )
+
+
+def run(context: CryptContext, workers: int, logins: int) -> float:
+    stored_hash = context.hash("correct horse battery staple")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda _: context.verify("correct horse battery staple", stored_hash), range(logins)))
+    elapsed = time.perf_counter() - started
+    assert all(results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Argon2 logins per second per core")
+    parser.add_argument("--memory-cost", type=int, default=auth.ARGON2_MEMORY_COST, help="KiB")
+    parser.add_argument("--time-cost", type=int, default=auth.ARGON2_TIME_COST)
+    parser.add_argument("--parallelism", type=int, default=auth.ARGON2_PARALLELISM)
+    parser.add_argument("--logins", type=int, default=40)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    context = make_context(args.memory_cost, args.time_cost, args.parallelism)
+    print(f"Argon2id m={args.memory_cost}KiB t={args.time_cost} p={args.parallelism} on {cores} core(s)")
+
+    single = run(context, 1, max(args.logins // 4, 5))
+    print(f"  1 worker:   {single:6.1f} logins/s ({1000 / single:.0f} ms per login)")
+
+    pooled = run(context, auth.PASSWORD_HASH_WORKERS, args.logins)
+    print(f"  {auth.PASSWORD_HASH_WORKERS} workers:  {pooled:6.1f} logins/s")
+    print(f"  per core:   {pooled / cores:6.1f} logins/s/core")
+    print(f"  peak hash memory: ~{auth.PASSWORD_HASH_WORKERS * args.memory_cost / 1024:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
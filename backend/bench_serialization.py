@@ -0,0 +1,151 @@
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+
+import compression
+import models
+import schemas
+import serializers
+
+# Compares how the catalog endpoints serialize their payloads:
+#   orm+jsonable  ORM objects -> jsonable_encoder -> json.dumps (FastAPI's response_model path)
+#   orm+pydantic  ORM objects -> Pydantic TypeAdapter -> dump_json (the previous cache builder)
+#   rows+orjson   column SELECT -> dicts -> orjson (serializers.py)
+# and how many bytes each payload puts on the wire with and without compression.
+#
+#   python bench_serialization.py --levels 30 --questions 25 --posts 100 --repeat 50
+
+ADAPTERS = {
+    "levels": TypeAdapter(List[schemas.Level]),
+    "store": TypeAdapter(List[schemas.StoreItemSchema]),
+    "feed": TypeAdapter(List[schemas.CommunityFeedSchema]),
+}
+
+
+def seed(engine, levels: int, questions: int, posts: int, items: int):
+    models.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        for i in range(1, levels + 1):
+            db.add(models.Level(
+                id=i, title=f"Level {i}", description=f"Learn about topic {i}", order=i, xp_reward=100,
+                theme_id="forest", video_id="dQw4w9WgXcQ",
+                task_description="Upload a photo proving you completed the eco-task!",
+                info_content=" ".join(f"Recycling fact {n} for level {i}." for n in range(60)),
+            ))
+            db.add_all([
+                models.Question(
+                    level_id=i, text=f"Which bin does item {q} of level {i} go in?",
+                    options=["Wet waste", "Dry waste", "Hazardous waste", "E-waste"],
+                    correct_index=q % 4, difficulty=q % 5 + 1, segment_index=q % 5,
+                )
+                for q in range(questions)
+            ])
+        db.add_all([
+            models.StoreItem(name=f"Item {i}", description=f"A reward for eco hero {i}", price=50 * i,
+                             icon_type="badge", category="Virtual")
+            for i in range(items)
+        ])
+        db.add_all([
+            models.CommunityFeed(title=f"Drive {i}", category=["Waste", "Water", "Energy", "Greenery"][i % 4],
+                                 location="Delhi", description=f"Join clean-up drive number {i} this weekend.",
+                                 external_link="https://example.org", created_at=date.today() - timedelta(days=i))
+            for i in range(posts)
+        ])
+        db.commit()
+
+
+def orm_objects(db, name: str):
+    if name == "levels":
+        return db.query(models.Level).options(selectinload(models.Level.questions)).order_by(models.Level.id).all()
+    if name == "store":
+        return db.query(models.StoreItem).order_by(models.StoreItem.id).all()
+    return db.query(models.CommunityFeed).order_by(
+        models.CommunityFeed.created_at.desc(), models.CommunityFeed.id.desc()
+    ).limit(100).all()
+
+
+def orm_jsonable(db, name: str) -> bytes:
+    data = ADAPTERS[name].validate_python(orm_objects(db, name), from_attributes=True)
+    return json.dumps(jsonable_encoder(data), separators=(",", ":")).encode()
+
+
+def orm_pydantic(db, name: str) -> bytes:
+    adapter = ADAPTERS[name]
+    return adapter.dump_json(adapter.validate_python(orm_objects(db, name), from_attributes=True))
+
+
+def rows_orjson(db, name: str) -> bytes:
+    if name == "levels":
+        return serializers.dumps(serializers.levels(db))
+    if name == "store":
+        return serializers.dumps(serializers.store_items(db))
+    rows = db.execute(serializers.feed_select().limit(100)).all()
+    return serializers.dumps(serializers.rows_to_dicts(rows, serializers.FEED_COLUMNS))
+
+
+def timed(Session, build, name: str, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        # A fresh session each time, like a cache miss in the endpoint
+        with Session() as db:
+            started = time.perf_counter()
+            body = build(db, name)
+            best = min(best, time.perf_counter() - started)
+    return body, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog serialization time and bytes on the wire")
+    parser.add_argument("--levels", type=int, default=30)
+    parser.add_argument("--questions", type=int, default=25)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        seed(engine, args.levels, args.questions, args.posts, args.items)
+        Session = sessionmaker(bind=engine)
+
+        print(f"Serialization (best of {args.repeat}, ms):")
+        print(f"{'payload':<8} {'orm+jsonable':>13} {'orm+pydantic':>13} {'rows+orjson':>12} {'speedup':>8}")
+        bodies = {}
+        for name in ADAPTERS:
+            old_body, jsonable_ms = timed(Session, orm_jsonable, name, args.repeat)
+            _, pydantic_ms = timed(Session, orm_pydantic, name, args.repeat)
+            body, orjson_ms = timed(Session, rows_orjson, name, args.repeat)
+            if json.loads(old_body) != json.loads(body):
+                raise SystemExit(f"{name}: rows+orjson output differs from the response model")
+            bodies[name] = body
+            print(f"{name:<8} {jsonable_ms:13.2f} {pydantic_ms:13.2f} {orjson_ms:12.2f} "
+                  f"{pydantic_ms / orjson_ms:7.1f}x")
+
+        print("\nBytes on the wire:")
+        print(f"{'payload':<8} {'identity':>9} {'gzip-6':>9} {'br-5':>9} {'gzip-9*':>9} {'br-11*':>9}")
+        for name, body in bodies.items():
+            sizes = [len(body), len(gzip.compress(body, compresslevel=compression.GZIP_LEVEL))]
+            if compression.brotli is not None:
+                sizes.append(len(compression.brotli.compress(body, quality=compression.BROTLI_QUALITY)))
+            else:
+                sizes.append(0)
+            sizes.append(len(compression.compress(body, "gzip")))
+            sizes.append(len(compression.compress(body, "br")) if compression.brotli is not None else 0)
+            print(f"{name:<8} " + " ".join(f"{size:9d}" for size in sizes))
+        print("(* pre-compressed once per cache entry; gzip-6/br-5 are the middleware settings)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+import migrations
+import models
+
+# Runs EXPLAIN QUERY PLAN for the hot lookup paths and fails (exit 1) if any of
+# them falls back to a full table scan or sorts the leaderboard in a temp B-tree.
+#
+#   python check_query_plans.py                  # fresh schema from models.py
+#   python check_query_plans.py --db ecoloop.db  # an existing database (migrations applied first)
+
+HOT_QUERIES = {
+    "daily challenge completion": (
+        "SELECT id FROM user_challenge_completions "
+        "WHERE user_id = :user_id AND challenge_id = :challenge_id AND completion_date = :day LIMIT 1",
+        {"user_id": 1, "challenge_id": 1, "day": "2025-01-01"},
+    ),
+    "weekly challenge completion": (
+        "SELECT id FROM user_challenge_completions "
+        "WHERE user_id = :user_id AND challenge_id = :challenge_id AND completion_date >= :day LIMIT 1",
+        {"user_id": 1, "challenge_id": 1, "day": "2025-01-01"},
+    ),
+    "level progress": (
+        "SELECT id, status FROM user_progress WHERE user_id = :user_id AND level_id = :level_id LIMIT 1",
+        {"user_id": 1, "level_id": 1},
+    ),
+    "owned store item": (
+        "SELECT id FROM user_items WHERE user_id = :user_id AND item_id = :item_id LIMIT 1",
+        {"user_id": 1, "item_id": 1},
+    ),
+    "next level by order": (
+        'SELECT id FROM levels WHERE "order" = :order LIMIT 1',
+        {"order": 2},
+    ),
+    "challenge status": (
+        "SELECT challenges.id, last.last_completed FROM challenges LEFT OUTER JOIN "
+        "(SELECT challenge_id, max(completion_date) AS last_completed FROM user_challenge_completions "
+        "WHERE user_id = :user_id AND completion_date >= :day GROUP BY challenge_id) AS last "
+        "ON last.challenge_id = challenges.id WHERE challenges.is_active = 1",
+        {"user_id": 1, "day": "2025-01-01"},
+    ),
+    "quiz bundle": (
+        "SELECT id, segment_index, difficulty FROM questions WHERE level_id = :level_id "
+        "ORDER BY segment_index, difficulty, id",
+        {"level_id": 1},
+    ),
+    "community feed page": (
+        "SELECT id FROM community_feed WHERE (created_at, id) < (:day, :id) "
+        "ORDER BY created_at DESC, id DESC LIMIT 21",
+        {"day": "2025-01-01", "id": 10},
+    ),
+    "community feed by category": (
+        "SELECT id FROM community_feed WHERE category = :category AND (created_at, id) < (:day, :id) "
+        "ORDER BY created_at DESC, id DESC LIMIT 21",
+        {"category": "Waste", "day": "2025-01-01", "id": 10},
+    ),
+    "community feed by location": (
+        "SELECT id FROM community_feed WHERE location = :location "
+        "ORDER BY created_at DESC, id DESC LIMIT 21",
+        {"location": "Delhi"},
+    ),
+    "leaderboard": (
+        "SELECT username, coins, streak FROM users ORDER BY coins DESC, streak DESC LIMIT 10",
+        {},
+    ),
+}
+
+
+# Small catalog tables that endpoints list in full by design
+FULL_SCAN_ALLOWED = {"challenges"}
+
+
+def plan_problems(plan_rows) -> list:
+    problems = []
+    for row in plan_rows:
+        detail = row[-1]
+        # 'SCAN users' (or 'SCAN TABLE users' on older SQLite) without 'USING ... INDEX' is a full scan
+        scanned_table = detail.replace("SCAN TABLE", "SCAN").split(" ")[1] if detail.startswith("SCAN") else None
+        if scanned_table and "USING" not in detail and scanned_table not in FULL_SCAN_ALLOWED:
+            problems.append(f"full table scan: {detail}")
+        if "TEMP B-TREE" in detail:
+            problems.append(f"unindexed sort: {detail}")
+    return problems
+
+
+def check(engine) -> bool:
+    ok = True
+    with engine.connect() as conn:
+        for name, (sql, params) in HOT_QUERIES.items():
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            problems = plan_problems(plan)
+            status = "✅" if not problems else "❌"
+            print(f"{status} {name:<28} {' | '.join(row[-1] for row in plan)}")
+            for problem in problems:
+                print(f"     {problem}")
+            ok = ok and not problems
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assert the hot queries use indexes")
+    parser.add_argument("--db", help="SQLite file to check (default: a fresh schema in a temp dir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, "plans.db")
+        engine = create_engine(f"sqlite:///{path}")
+        models.Base.metadata.create_all(bind=engine)
+        migrations.run_migrations(engine)
+        ok = check(engine)
+        engine.dispose()
+
+    print("\nAll hot paths are indexed." if ok else "\nSome hot paths need an index.")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
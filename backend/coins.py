@@ -0,0 +1,86 @@
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+import models
+
+# Every balance change is one `UPDATE users SET coins = coins + :delta ... RETURNING coins`
+# plus a ledger row in the same transaction, so concurrent requests can't lose updates
+# and every coin can be traced. The caller commits.
+
+
+def _balance_update(user_id: int, delta: int, require_balance: Optional[int] = None):
+    statement = update(models.User).where(models.User.id == user_id)
+    if require_balance is not None:
+        # Conditional debit: only matches when the balance covers the amount
+        statement = statement.where(models.User.coins >= require_balance)
+    return (
+        statement.values(coins=models.User.coins + delta)
+        .returning(models.User.coins)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _record(db, user: models.User, delta: int, new_balance: int, reason: str, reference: Optional[str]):
+    db.add(models.CoinLedger(user_id=user.id, delta=delta, balance_after=new_balance, reason=reason, reference=reference))
+    # Keep the loaded user in sync without marking it dirty (a flush must not write the old value back)
+    set_committed_value(user, "coins", new_balance)
+
+
+def credit(db: Session, user: models.User, delta: int, reason: str, reference: Optional[str] = None) -> int:
+    if delta == 0:
+        return user.coins
+    new_balance = db.execute(_balance_update(user.id, delta)).scalar_one()
+    _record(db, user, delta, new_balance, reason, reference)
+    return new_balance
+
+
+def debit_if_sufficient(db: Session, user: models.User, amount: int, reason: str,
+                        reference: Optional[str] = None) -> Optional[int]:
+    """
+    Deducts `amount` only if the balance covers it; returns the new balance, or None if it doesn't.
+    """
+    new_balance = db.execute(_balance_update(user.id, -amount, require_balance=amount)).scalar_one_or_none()
+    if new_balance is None:
+        return None
+    _record(db, user, -amount, new_balance, reason, reference)
+    return new_balance
+
+
+async def credit_async(db: AsyncSession, user: models.User, delta: int, reason: str,
+                       reference: Optional[str] = None) -> int:
+    if delta == 0:
+        return user.coins
+    new_balance = (await db.execute(_balance_update(user.id, delta))).scalar_one()
+    _record(db, user, delta, new_balance, reason, reference)
+    return new_balance
+
+
+# --- Reconciliation ---
+
+def find_mismatches(db: Session, batch_size: int = 1000):
+    """
+    Yields (user_id, username, balance, ledger_total) for users whose balance
+    differs from the sum of their ledger entries, scanning users in id batches.
+    """
+    last_id = 0
+    while True:
+        ledger_total = (
+            select(models.CoinLedger.user_id, func.sum(models.CoinLedger.delta).label("total"))
+            .where(models.CoinLedger.user_id > last_id, models.CoinLedger.user_id <= last_id + batch_size)
+            .group_by(models.CoinLedger.user_id)
+            .subquery()
+        )
+        rows = db.execute(
+            select(models.User.id, models.User.username, models.User.coins,
+                   func.coalesce(ledger_total.c.total, 0))
+            .outerjoin(ledger_total, ledger_total.c.user_id == models.User.id)
+            .where(models.User.id > last_id, models.User.id <= last_id + batch_size)
+        ).all()
+        if not rows and not db.execute(select(models.User.id).where(models.User.id > last_id).limit(1)).first():
+            return
+        for user_id, username, balance, total in rows:
+            if (balance or 0) != total:
+                yield user_id, username, balance or 0, total
+        last_id += batch_size
@@ -0,0 +1,81 @@
+import gzip
+import os
+from dotenv import load_dotenv
+from fastapi.middleware.gzip import GZipMiddleware
+
+load_dotenv()
+
+# Brotli is optional: `pip install brotli-asgi` (pulls in `brotli`) enables 'br' responses,
+# otherwise everything falls back to gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# --- Compression Configuration ---
+# Bodies smaller than this are sent as-is (compression overhead outweighs the savings)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1000))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+# Pre-compressed (cached) payloads are compressed once, so they can afford maximum effort
+PRECOMPRESSED_GZIP_LEVEL = 9
+PRECOMPRESSED_BROTLI_QUALITY = 11
+
+# Server-Sent Event streams must reach the client chunk by chunk
+STREAMING_PATHS = [r"^/chat/stream$", r"^/jobs/[^/]+/events$"]
+
+
+def add_compression(app):
+    """
+    Negotiated response compression: brotli (with gzip fallback) when brotli-asgi
+    is installed, gzip otherwise. Responses that already set Content-Encoding
+    (pre-compressed cache entries) pass through untouched.
+    """
+    if BrotliMiddleware is not None:
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=BROTLI_QUALITY,
+            minimum_size=COMPRESSION_MIN_BYTES,
+            gzip_fallback=True,
+            excluded_handlers=STREAMING_PATHS,
+        )
+    else:
+        # Starlette's gzip already skips text/event-stream responses
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES, compresslevel=GZIP_LEVEL)
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    encodings = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(accept_encoding: str, size: int):
+    """
+    The best encoding the client accepts for a body of `size` bytes, or None for identity.
+    """
+    if size < COMPRESSION_MIN_BYTES:
+        return None
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESSED_BROTLI_QUALITY)
+    # mtime=0 keeps the output (and therefore its ETag) identical across processes
+    return gzip.compress(body, compresslevel=PRECOMPRESSED_GZIP_LEVEL, mtime=0)
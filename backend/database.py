@@ -1,21 +1,128 @@
-from sqlalchemy import create_engine
+import os
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+load_dotenv()
+
+# 1. Database URL (defaults to a SQLite file named 'ecoloop.db' in the current directory)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ecoloop.db")
+
+# Async driver used for each database, for the async endpoints (same database, different DBAPI)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+# --- Connection Pool Configuration ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# Recycle server-side connections before typical MySQL/Postgres idle timeouts
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+# --- SQLite Tuning (applied on every new connection) ---
+# WAL lets readers run alongside the single writer; NORMAL sync is crash-safe in WAL mode
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+# Wait this long for a competing writer instead of failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+# Page cache per connection in KiB (passed to SQLite as a negative number)
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, tuned: bool = True):
+    """
+    Creates the engine for `url`. File-based SQLite gets a connection pool plus the
+    pragmas above; other databases get a pre-pinged, recycled pool.
+    `tuned=False` gives the old defaults (used by bench_db_writes.py for comparison).
+    """
+    if is_sqlite(url):
+        # check_same_thread=False is needed because FastAPI serves sync routes from a thread pool
+        connect_args = {"check_same_thread": False}
+        if not tuned:
+            return create_engine(url, connect_args=connect_args)
+        connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+        pool_args = {}
+        if ":memory:" not in url and url not in ("sqlite://", "sqlite:///"):
+            pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+        sqlite_engine = create_engine(url, connect_args=connect_args, **pool_args)
+        event.listen(sqlite_engine, "connect", set_sqlite_pragmas)
+        return sqlite_engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+def to_async_url(url: str) -> str:
+    """
+    'sqlite:///./ecoloop.db' -> 'sqlite+aiosqlite:///./ecoloop.db', 'postgresql+psycopg2://...' -> 'postgresql+asyncpg://...'
+    """
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{dialect}'; set ASYNC_DATABASE_URL explicitly.")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+def build_async_engine(url: str):
+    if is_sqlite(url):
+        async_engine = create_async_engine(url, connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000})
+        # Pragmas are per connection, so hook the underlying sync engine's connect event
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+        return async_engine
+
+    return create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
 
-# 1. Create a SQLite database file named 'ecoloop.db' in the current directory
-SQLALCHEMY_DATABASE_URL = "sqlite:///./ecoloop.db"
 
 # 2. Create the SQLAlchemy engine
-# connect_args={"check_same_thread": False} is needed specifically for SQLite
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = build_engine(SQLALCHEMY_DATABASE_URL)
 
 # 3. Create a SessionLocal class
 # This will be the main point of contact for database operations
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async counterpart for `async def` routes, so DB I/O doesn't block the event loop.
+# expire_on_commit=False keeps loaded objects usable after commit without another round trip.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = build_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # 4. Create a Base class
 # All ORM models will inherit from this
 Base = declarative_base()
@@ -27,3 +134,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,6 @@
 import os
+import argparse
+import asyncio
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
@@ -18,6 +20,11 @@ genai.configure(api_key=GOOGLE_API_KEY)
 VIDEO_DIR = "static/videos"
 OUTPUT_FILE = "generated_questions.json"
 LEVELS = [1, 2, 3, 4, 5]
+# Levels processed at once (each holds one upload + one generation)
+DEFAULT_CONCURRENCY = int(os.getenv("QUESTION_GEN_CONCURRENCY", 3))
+# Uploaded file handles are reused across runs; Gemini deletes uploads after 48h
+UPLOAD_CACHE_FILE = ".gemini_upload_cache.json"
+UPLOAD_CACHE_TTL_SECONDS = 47 * 3600
 
 SYSTEM_PROMPT = """
 You are an expert educational content creator for the EcoLoop platform.
@@ -35,7 +42,7 @@ JSON_SCHEMA = """
   {
     "segment_index": 0,
     "text": "Question text here?",
-    "options": "Option A|Option B|Option C|Option D",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
     "correct_index": 0, # Index of correct option (0-3)
     "difficulty": 1
   },
@@ -43,7 +50,66 @@ JSON_SCHEMA = """
 ]
 """
 
-def generate_questions_for_video(video_path, level_id):
+# --- Upload Handle Cache ---
+
+def load_upload_cache():
+    if not os.path.exists(UPLOAD_CACHE_FILE):
+        return {}
+    try:
+        with open(UPLOAD_CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_json_atomic(path, data):
+    # Write to a temp file first so an interrupted run never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def upload_fingerprint(video_path):
+    stat = os.stat(video_path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+async def get_uploaded_video(video_path, level_id, upload_cache):
+    """
+    Reuses a still-valid upload of this exact file from a previous run, otherwise uploads it.
+    Waits (without blocking the event loop) until Gemini has finished processing.
+    """
+    cached = upload_cache.get(video_path)
+    video_file = None
+    if (cached and cached.get("fingerprint") == upload_fingerprint(video_path)
+            and time.time() - cached["uploaded_at"] < UPLOAD_CACHE_TTL_SECONDS):
+        try:
+            video_file = await asyncio.to_thread(genai.get_file, cached["name"])
+            print(f"[Level {level_id}] Reusing upload {video_file.name}")
+        except Exception as e:
+            print(f"[Level {level_id}] Cached upload unavailable ({e}), re-uploading...")
+            video_file = None
+
+    if video_file is None or video_file.state.name == "FAILED":
+        print(f"[Level {level_id}] Uploading to Gemini...")
+        video_file = await asyncio.to_thread(genai.upload_file, path=video_path)
+        upload_cache[video_path] = {
+            "name": video_file.name,
+            "uploaded_at": time.time(),
+            "fingerprint": upload_fingerprint(video_path),
+        }
+        save_json_atomic(UPLOAD_CACHE_FILE, upload_cache)
+
+    while video_file.state.name == "PROCESSING":
+        await asyncio.sleep(2)
+        video_file = await asyncio.to_thread(genai.get_file, video_file.name)
+
+    if video_file.state.name == "FAILED":
+        upload_cache.pop(video_path, None)
+        raise Exception("Video processing failed.")
+    return video_file
+
+# --- Generation ---
+
+async def generate_questions_for_video(video_path, level_id, upload_cache):
     print(f"\nPROCESSING LEVEL {level_id}: {video_path}")
     
     if not os.path.exists(video_path):
@@ -51,27 +117,15 @@ def generate_questions_for_video(video_path, level_id):
         return []
 
     try:
-        # 1. Upload Video
-        print("Uploading to Gemini...")
-        video_file = genai.upload_file(path=video_path)
-        
-        # Wait for processing
-        print("Waiting for processing", end="")
-        while video_file.state.name == "PROCESSING":
-            print(".", end="", flush=True)
-            time.sleep(2)
-            video_file = genai.get_file(video_file.name)
-        
-        if video_file.state.name == "FAILED":
-            raise Exception("Video processing failed.")
-        
-        print("\nVideo Ready. Generating questions...")
+        # 1. Upload Video (or reuse a previous upload)
+        video_file = await get_uploaded_video(video_path, level_id, upload_cache)
+        print(f"[Level {level_id}] Video Ready. Generating questions...")
 
         # 2. Generate
         model = genai.GenerativeModel('gemini-2.0-flash-lite-001') # Fast model
         prompt = f"{SYSTEM_PROMPT}\n\nSchema: {JSON_SCHEMA}\n\nTask: Generate 5 questions for this video."
         
-        response = model.generate_content([prompt, video_file], generation_config={"response_mime_type": "application/json"})
+        response = await model.generate_content_async([prompt, video_file], generation_config={"response_mime_type": "application/json"})
         
         # 3. Parse
         try:
@@ -91,30 +145,94 @@ def generate_questions_for_video(video_path, level_id):
         print(f"Error processing Level {level_id}: {e}")
         return []
 
-def main():
-    all_questions = []
+def video_path_for(level_num):
+    filename = f"level{level_num}.mp4"
+    path = os.path.join(VIDEO_DIR, filename)
     
-    for level_num in LEVELS:
-        filename = f"level{level_num}.mp4"
-        path = os.path.join(VIDEO_DIR, filename)
-        
-        # Check if file exists in current directory context
-        # The script is run from 'backend' usually, so path depends on CWD.
-        # Let's assume script runs from 'backend' dir, so static/videos is correct.
-        if not os.path.exists(path):
-            # Try absolute path if CWD is wrong
-            # Adjust based on known structure
-            path = f"/Users/namanagrawal/Documents/ecoloop/backend/static/videos/{filename}"
-
-        questions = generate_questions_for_video(path, level_num)
+    # Check if file exists in current directory context
+    # The script is run from 'backend' usually, so path depends on CWD.
+    # Let's assume script runs from 'backend' dir, so static/videos is correct.
+    if not os.path.exists(path):
+        # Try absolute path if CWD is wrong
+        # Adjust based on known structure
+        path = f"/Users/namanagrawal/Documents/ecoloop/backend/static/videos/{filename}"
+    return path
+
+# --- Checkpointing ---
+
+def load_checkpoint():
+    """
+    Existing questions grouped by level, so finished levels can be skipped.
+    """
+    if not os.path.exists(OUTPUT_FILE):
+        return {}
+    try:
+        with open(OUTPUT_FILE) as f:
+            questions = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        print(f"Warning: {OUTPUT_FILE} is unreadable, starting fresh.")
+        return {}
+
+    by_level = {}
+    skipped = 0
+    for q in questions:
+        # Entries without a usable level_id can't be resumed (or sorted), so drop them
+        try:
+            level_id = int(q["level_id"])
+        except (TypeError, KeyError, ValueError):
+            skipped += 1
+            continue
+        q["level_id"] = level_id
+        by_level.setdefault(level_id, []).append(q)
+    if skipped:
+        print(f"Warning: ignoring {skipped} questions without a level_id in {OUTPUT_FILE}.")
+    return by_level
+
+def save_checkpoint(by_level):
+    all_questions = [q for level_id in sorted(by_level) for q in by_level[level_id]]
+    save_json_atomic(OUTPUT_FILE, all_questions)
+    return len(all_questions)
+
+async def run_batch(levels, concurrency, force):
+    by_level = load_checkpoint()
+    upload_cache = load_upload_cache()
+    pending = [level for level in levels if force or not by_level.get(level)]
+    skipped = [level for level in levels if level not in pending]
+    if skipped:
+        print(f"Resuming: levels {skipped} already in {OUTPUT_FILE}, skipping.")
+    if not pending:
+        print("Nothing to do.")
+        return by_level, []
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+
+    async def process(level_num):
+        async with semaphore:
+            questions = await generate_questions_for_video(video_path_for(level_num), level_num, upload_cache)
         if questions:
-            all_questions.extend(questions)
-    
-    # Save to file
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(all_questions, f, indent=2)
+            # Checkpoint immediately so a later failure or Ctrl+C doesn't lose this level
+            by_level[level_num] = questions
+            save_checkpoint(by_level)
+        else:
+            failed.append(level_num)
+
+    await asyncio.gather(*[process(level_num) for level_num in pending])
+    return by_level, sorted(failed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate quiz questions from the level videos")
+    parser.add_argument("--levels", type=int, nargs="+", default=LEVELS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--force", action="store_true", help="Regenerate levels that already have questions")
+    args = parser.parse_args()
+
+    by_level, failed = asyncio.run(run_batch(args.levels, max(1, args.concurrency), args.force))
+    total = sum(len(questions) for questions in by_level.values())
     
-    print(f"\nDone! Saved {len(all_questions)} questions to {OUTPUT_FILE}")
+    print(f"\nDone! {OUTPUT_FILE} has {total} questions.")
+    if failed:
+        print(f"Levels {failed} failed; run again to retry only those.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+import asyncio
+import io
+import os
+from dotenv import load_dotenv
+from PIL import Image, ImageOps
+from typing import Union
+
+load_dotenv()
+
+# --- Preprocessing Configuration ---
+# Longest edge (px) of the image sent to Gemini; larger photos are downscaled
+AI_IMAGE_MAX_EDGE = int(os.getenv("AI_IMAGE_MAX_EDGE", 1024))
+# JPEG quality used when re-encoding
+AI_IMAGE_QUALITY = int(os.getenv("AI_IMAGE_QUALITY", 80))
+
+# Running totals, reported at /ai/health
+stats = {"images": 0, "original_bytes": 0, "encoded_bytes": 0}
+
+
+class PreparedImage:
+    """
+    A downscaled, EXIF-free JPEG ready to hand to the model as an inline blob.
+    """
+    def __init__(self, data: bytes, original_bytes: int, width: int, height: int):
+        self.data = data
+        self.mime_type = "image/jpeg"
+        self.original_bytes = original_bytes
+        self.width = width
+        self.height = height
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    def as_part(self) -> dict:
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def prepare_image(source: Union[str, bytes], max_edge: int = AI_IMAGE_MAX_EDGE,
+                  quality: int = AI_IMAGE_QUALITY) -> PreparedImage:
+    """
+    Applies EXIF orientation, downscales to `max_edge`, and re-encodes as JPEG
+    without metadata. `source` is a file path or the raw upload bytes.
+    """
+    if isinstance(source, bytes):
+        original_bytes = len(source)
+        image = Image.open(io.BytesIO(source))
+    else:
+        original_bytes = os.path.getsize(source)
+        image = Image.open(source)
+
+    with image:
+        # Let the JPEG decoder do most of the downscaling (DCT scaling) before pixels are loaded
+        image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        # No exif= argument: the re-encoded file carries no EXIF (GPS, device info, ...)
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+        prepared = PreparedImage(buffer.getvalue(), original_bytes, image.width, image.height)
+
+    stats["images"] += 1
+    stats["original_bytes"] += prepared.original_bytes
+    stats["encoded_bytes"] += len(prepared.data)
+
+    saved_pct = (prepared.saved_bytes / prepared.original_bytes * 100) if prepared.original_bytes else 0
+    print(f"DEBUG: Image preprocessed {prepared.original_bytes / 1024:.0f}KB -> "
+          f"{len(prepared.data) / 1024:.0f}KB ({prepared.width}x{prepared.height}, {saved_pct:.0f}% saved)")
+    return prepared
+
+
+async def prepare_image_async(source: Union[str, bytes], **kwargs) -> PreparedImage:
+    """
+    Runs prepare_image in a worker thread so decoding/resizing never blocks the event loop.
+    """
+    return await asyncio.to_thread(prepare_image, source, **kwargs)
@@ -0,0 +1,72 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Sort key: most coins first, then longest streak, then oldest account (stable tie-break)
+Key = Tuple[int, int, int]
+
+
+def _key(user_id: int, coins: int, streak: int) -> Key:
+    return (-(coins or 0), -(streak or 0), user_id)
+
+
+class Leaderboard:
+    """
+    All users kept in a sorted list of (-coins, -streak, user_id) keys.
+    Rank lookups are a bisect (O(log n)); pages are list slices. Writers call
+    `update_user` after committing a coin or streak change, and `rebuild` loads
+    everything from the DB at startup. Each worker process keeps its own copy.
+    """
+    def __init__(self):
+        self._keys: List[Key] = []
+        self._users: Dict[int, Tuple[Key, str]] = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, rows):
+        """
+        `rows` are (id, username, coins, streak) tuples for every user.
+        """
+        users = {user_id: (_key(user_id, coins, streak), username) for user_id, username, coins, streak in rows}
+        keys = sorted(key for key, _ in users.values())
+        with self._lock:
+            self._users = users
+            self._keys = keys
+        print(f"DEBUG: Leaderboard built with {len(keys)} users")
+
+    def update(self, user_id: int, username: str, coins: int, streak: int):
+        new_key = _key(user_id, coins, streak)
+        with self._lock:
+            old = self._users.get(user_id)
+            if old is not None:
+                if old[0] == new_key and old[1] == username:
+                    return
+                index = bisect.bisect_left(self._keys, old[0])
+                del self._keys[index]
+            bisect.insort(self._keys, new_key)
+            self._users[user_id] = (new_key, username)
+
+    def update_user(self, user):
+        self.update(user.id, user.username, user.coins, user.streak)
+
+    def _entry(self, key: Key, rank: int) -> dict:
+        coins, streak, user_id = -key[0], -key[1], key[2]
+        return {"rank": rank, "username": self._users[user_id][1], "coins": coins, "streak": streak}
+
+    def page(self, offset: int = 0, limit: int = 10) -> List[dict]:
+        with self._lock:
+            keys = self._keys[offset:offset + limit]
+            return [self._entry(key, offset + i + 1) for i, key in enumerate(keys)]
+
+    def rank(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            user = self._users.get(user_id)
+            if user is None:
+                return None
+            rank = bisect.bisect_left(self._keys, user[0]) + 1
+            return {**self._entry(user[0], rank), "total": len(self._keys)}
+
+    def __len__(self):
+        return len(self._keys)
+
+
+board = Leaderboard()
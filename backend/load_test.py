@@ -0,0 +1,99 @@
+import argparse
+import io
+import random
+import statistics
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image
+
+# Load generator for /chat, /verify-task and /eco-scanner.
+# Start the server with AI_PROVIDER=fake (see ai_providers.FakeProvider) to measure
+# throughput and failover behaviour without network access or Gemini quota, e.g.:
+#
+#   AI_PROVIDER=fake FAKE_AI_LATENCY=lognormal:250,0.5 FAKE_AI_QUOTA_RATE=0.1 uvicorn main:app
+#
+# The quota governor still applies (AI_MODEL_RPM, default 15/model); raise it to measure raw
+# throughput, or keep it low to watch chat being shed before verification.
+#   python load_test.py --endpoint verify --requests 500 --concurrency 50
+
+
+def random_image(size: int = 256) -> bytes:
+    # Unique pixels per request so the verification cache and single-flight don't hide the load
+    image = Image.frombytes("RGB", (size, size), random.randbytes(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def get_token(base_url: str) -> str:
+    username = f"loadtest_{uuid.uuid4().hex[:8]}"
+    password = "loadtest-password"
+    response = requests.post(f"{base_url}/register", json={
+        "username": username, "email": f"{username}@example.com", "password": password,
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def make_request(session: requests.Session, base_url: str, endpoint: str, headers: dict, same_image: bytes):
+    image = same_image or random_image()
+    start = time.perf_counter()
+    if endpoint == "chat":
+        response = session.post(f"{base_url}/chat", json={"message": f"How do I recycle batteries? #{uuid.uuid4().hex[:6]}"})
+    elif endpoint == "verify":
+        response = session.post(f"{base_url}/verify-task", headers=headers,
+                                files={"file": ("proof.jpg", image, "image/jpeg")},
+                                data={"task_label": "a potted plant"})
+    else:
+        response = session.post(f"{base_url}/eco-scanner", headers=headers,
+                                files={"file": ("scan.jpg", image, "image/jpeg")})
+    return response.status_code, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EcoLoop AI endpoint load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["chat", "verify", "scan"], default="chat")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--same-image", action="store_true", help="Reuse one image (exercises cache/coalescing)")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {get_token(args.url)}"}
+    same_image = random_image() if args.same_image else None
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=args.concurrency, pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+
+    print(f"Sending {args.requests} {args.endpoint} requests with concurrency {args.concurrency}...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda _: make_request(session, args.url, args.endpoint, headers, same_image),
+            range(args.requests),
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for _, latency in results)
+    statuses = Counter(status for status, _ in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+
+    print(f"\nThroughput: {args.requests / elapsed:.1f} req/s over {elapsed:.1f}s")
+    print(f"Latency:    p50 {statistics.median(latencies) * 1000:.0f} ms | p95 {p95 * 1000:.0f} ms | max {latencies[-1] * 1000:.0f} ms")
+    print(f"Statuses:   {dict(statuses)}")
+
+    health = requests.get(f"{args.url}/ai/health").json()
+    print("\nCircuit breakers:")
+    for model in health["models"]:
+        print(f"  {model['model']:<36} {model['state']:<10} ok={model['successes']} failed={model['failures']}")
+    print("\nQuota buckets:")
+    for bucket in health["quota"]:
+        print(f"  {bucket['model']:<36} fill={bucket['fill']:.0%} granted={bucket['granted']} shed={bucket['shed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,67 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status, File, UploadFile, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import models
 import schemas
 import database
 import auth
 import ai_service
-from typing import List
+import image_pipeline
+from typing import List, Optional
 from datetime import date, timedelta
 import os
-import time
+import json
+import base64
 import email_utils
+import uploads
+import verification_jobs
+import migrations
+import response_cache
+import leaderboard
+import coins
+import compression
+import serializers
+import seeding
+from contextlib import asynccontextmanager
 
 # Initialize DB
 models.Base.metadata.create_all(bind=database.engine)
+# Bring older ecoloop.db files up to date (indexes added since the tables were created)
+migrations.run_migrations(database.engine)
 
-app = FastAPI(title="EcoLoop API")
+# Bounded worker pool for job-based verification
+job_queue = verification_jobs.JobQueue()
+
+# Pre-serialized level catalog (questions included), rebuilt after /seed
+levels_cache = response_cache.ResponseCache("Levels")
+# Per-level quiz bundles (and their single segments) for the video player, rebuilt after /seed
+quiz_cache = response_cache.ResponseCache("Quiz Bundles")
+# Read-mostly catalogs, rebuilt after /seed (store) and /seed-full (feed)
+store_cache = response_cache.ResponseCache("Store")
+feed_cache = response_cache.ResponseCache("Community Feed")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Remove spooled uploads left behind by crashed workers
+    uploads.sweep_spool_dir()
+    # Rank every user once; writes keep the board current from here on
+    with database.SessionLocal() as db:
+        leaderboard.board.rebuild(
+            db.query(models.User.id, models.User.username, models.User.coins, models.User.streak).all()
+        )
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    await database.async_engine.dispose()
+    auth.password_executor.shutdown(wait=False)
+
+# orjson for every JSON response (faster than the stdlib encoder, native date support)
+app = FastAPI(title="EcoLoop API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # CORS (Allow Frontend)
 origins = [
@@ -36,6 +81,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized uploads (413) before the multipart body is parsed
+app.add_middleware(uploads.UploadSizeLimitMiddleware)
+# Outermost, so it compresses every response (except SSE streams) above the size threshold
+compression.add_compression(app)
+
 # Mount Static Files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -45,58 +95,77 @@ def root():
 
 # --- Helpers ---
 
+def next_streak(streak: int, last_login, today: date) -> int:
+    """
+    The streak after completing a task today, given the previous streak and last task date.
+    """
+    if last_login is None:
+        # First task ever
+        return 1
+    if last_login == today:
+        # Already counted today, we don't increment multiple times
+        return streak
+    if last_login == today - timedelta(days=1):
+        return streak + 1
+    # Reset if they haven't completed a task since yesterday
+    return 1
+
+def apply_streak(user: models.User):
+    """
+    Updates the user's streak in memory; the caller commits (sync or async session).
+    """
+    today = date.today()
+    user.streak = next_streak(user.streak, user.last_login, today)
+    user.last_login = today
+
 def update_user_streak(user: models.User, db: Session):
     """
     Updates the user's streak based on the date of the last action.
     Should be called ONLY during task completion.
     """
-    today = date.today()
-    if user.last_login is None:
-        # First task ever
-        user.streak = 1
-    elif user.last_login != today:
-        if user.last_login == today - timedelta(days=1):
-            user.streak += 1
-        else:
-            # Reset if they haven't completed a task since yesterday
-            user.streak = 1
-    
-    # If user.last_login == today, we don't increment multiple times
-    user.last_login = today
+    apply_streak(user)
     db.commit()
 
+def on_user_changed(user):
+    """
+    Call after committing a coin, streak or profile change: re-ranks the user and
+    drops their cached principals so the next request sees fresh values.
+    """
+    leaderboard.board.update_user(user)
+    auth.principal_cache.invalidate(user.username)
+
 # --- Authentication Routes ---
 
 @app.post("/register", response_model=schemas.Token)
-def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
     # Normalize username to lowercase
     user.username = user.username.lower()
 
     # Check if user exists
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+    db_user = (await db.execute(select(models.User).where(models.User.username == user.username))).scalars().first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    db_email = db.query(models.User).filter(models.User.email == user.email).first()
+    db_email = (await db.execute(select(models.User).where(models.User.email == user.email))).scalars().first()
     if db_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create User
-    hashed_pwd = auth.get_password_hash(user.password)
+    # Create User (hashing runs on the dedicated password executor)
+    hashed_pwd = await auth.password_hasher.hash(user.password)
     new_user = models.User(
         username=user.username, 
         email=user.email, 
         hashed_password=hashed_pwd,
+        coins=0,
         streak=0,
         last_login=None
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
     
     # Initialize Progress (Unlock Level 1)
     # Get Level 1 ID
-    level1 = db.query(models.Level).filter(models.Level.order == 1).first()
+    level1 = (await db.execute(select(models.Level).where(models.Level.order == 1))).scalars().first()
     if level1:
         new_progress = models.UserProgress(
             user_id=new_user.id,
@@ -105,7 +174,8 @@ def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
             score=0
         )
         db.add(new_progress)
-        db.commit()
+    await db.commit()
+    on_user_changed(new_user)
     
     # Create Token
     access_token = auth.create_access_token(data={"sub": new_user.username})
@@ -113,16 +183,21 @@ def register(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/login", response_model=schemas.Token)
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(database.get_db)):
+async def login(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(database.get_async_db)):
     # Normalize username
     user_credentials.username = user_credentials.username.lower()
     
-    user = db.query(models.User).filter(models.User.username == user_credentials.username).first()
+    user = (await db.execute(select(models.User).where(models.User.username == user_credentials.username))).scalars().first()
     if not user:
         raise HTTPException(status_code=400, detail="Invalid Credentials")
     
-    if not auth.verify_password(user_credentials.password, user.hashed_password):
+    is_valid, new_hash = await auth.password_hasher.verify_and_update(user_credentials.password, user.hashed_password)
+    if not is_valid:
         raise HTTPException(status_code=400, detail="Invalid Credentials")
+    if new_hash:
+        # Argon2 cost settings changed since this hash was made: upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
         
     # Login no longer updates streak to ensure it's task-based
     # update_user_streak(user, db)
@@ -134,18 +209,15 @@ def login(user_credentials: schemas.UserLogin, db: Session = Depends(database.ge
 def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
     return current_user
 
-@app.post("/users/progress")
-def update_progress(
-    progress_data: schemas.ProgressUpdate, 
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
-):
+def apply_progress_update(db: Session, current_user: models.User, progress_data: schemas.ProgressUpdate):
     # 1. Update User Coins & Streak
-    current_user.coins += progress_data.coins_earned
+    coins.credit(db, current_user, progress_data.coins_earned, "level_progress", f"level:{progress_data.level_id}")
     
-    # Only update streak if it's a level completion (task verified)
+    # Only update streak if it's a level completion (task verified).
+    # In memory only: credit, streak and progress commit together in update_progress,
+    # so a rollback there undoes all of them before the retry.
     if progress_data.is_level_completion:
-        update_user_streak(current_user, db)
+        apply_streak(current_user)
     # 2. Check/Update UserProgress for this Level
     user_progress = db.query(models.UserProgress).filter(
         models.UserProgress.user_id == current_user.id,
@@ -191,22 +263,92 @@ def update_progress(
                     db.add(next_progress)
                 elif next_progress.status == "locked":
                     next_progress.status = "unlocked"
-        
-    db.commit()
+
+# Attempts before giving up when concurrent requests keep creating the same progress rows
+PROGRESS_UPDATE_ATTEMPTS = 3
+
+@app.post("/users/progress")
+def update_progress(
+    progress_data: schemas.ProgressUpdate, 
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(auth.get_current_user)
+):
+    for _ in range(PROGRESS_UPDATE_ATTEMPTS):
+        try:
+            apply_progress_update(db, current_user, progress_data)
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent request inserted this (user_id, level_id) progress row first
+            # (unique index). Start over: the retry finds that row and updates it instead.
+            db.rollback()
+    else:
+        raise HTTPException(status_code=409, detail="Progress is being updated by another request. Please retry.")
     db.refresh(current_user)
+    on_user_changed(current_user)
     return {"message": "Progress Updated", "new_balance": current_user.coins}
 
 # --- Game Routes ---
 
 @app.get("/levels", response_model=List[schemas.Level])
-def get_levels(db: Session = Depends(database.get_db)):
-    return db.query(models.Level).all()
+def get_levels(request: Request, db: Session = Depends(database.get_db)):
+    """
+    The level catalog, serialized once per /seed and revalidated with ETags (304 on repeat loads).
+    """
+    def build() -> bytes:
+        return serializers.dumps(serializers.levels(db))
+
+    payload = levels_cache.get_or_build("levels", build)
+    return response_cache.cached_json_response(request, payload)
+
+def level_quiz_payload(db: Session, level_id: int) -> response_cache.CachedPayload:
+    """
+    The cached quiz bundle for a level, with each segment precompiled as one of its parts.
+    Unknown levels raise 404 and are never cached.
+    """
+    def build() -> response_cache.CachedPayload:
+        bundle = serializers.quiz_bundle(db, level_id)
+        if bundle is None:
+            raise HTTPException(status_code=404, detail="Level not found")
+        parts = {
+            segment["segment_index"]: response_cache.CachedPayload(serializers.dumps(segment))
+            for segment in bundle["segments"]
+        }
+        return response_cache.CachedPayload(serializers.dumps(bundle), parts)
+
+    return quiz_cache.get_or_build(str(level_id), build)
+
+@app.get("/levels/{level_id}/quiz", response_model=schemas.QuizBundle)
+def get_level_quiz(level_id: int, request: Request, db: Session = Depends(database.get_db)):
+    """
+    A level's questions grouped by video segment, easiest first. Compiled once per /seed.
+    """
+    return response_cache.cached_json_response(request, level_quiz_payload(db, level_id))
+
+@app.get("/levels/{level_id}/quiz/{segment_index}", response_model=schemas.QuizSegment)
+def get_level_quiz_segment(level_id: int, segment_index: int, request: Request, db: Session = Depends(database.get_db)):
+    """
+    Just the questions for one video segment, served from the level's cached bundle
+    (404 if the level has no questions for that segment).
+    """
+    payload = level_quiz_payload(db, level_id).parts.get(segment_index)
+    if payload is None:
+        raise HTTPException(status_code=404, detail="Quiz segment not found")
+    return response_cache.cached_json_response(request, payload)
 
 @app.get("/leaderboard")
-def get_leaderboard(db: Session = Depends(database.get_db)):
-    # Return top 10 users by coins, then streak
-    users = db.query(models.User).order_by(models.User.coins.desc(), models.User.streak.desc()).limit(10).all()
-    return [{"username": u.username, "coins": u.coins, "streak": u.streak} for u in users]
+def get_leaderboard(offset: int = Query(0, ge=0), limit: int = Query(10, ge=1, le=100)):
+    # Users by coins, then streak (top 10 by default), served from the in-memory board
+    return leaderboard.board.page(offset, limit)
+
+@app.get("/leaderboard/me")
+def get_my_rank(current_user: auth.Principal = Depends(auth.get_current_principal)):
+    entry = leaderboard.board.rank(current_user.id)
+    if entry is None:
+        # Registered by another worker process since this one built its board
+        leaderboard.board.update_user(current_user)
+        entry = leaderboard.board.rank(current_user.id)
+    return entry
 
 # ---------------- CHAT ROUTE (Migrated) ----------------
 
@@ -218,80 +360,110 @@ async def chat_with_ecobot(request: schemas.ChatRequest):
     response = await ai_service.get_chat_response(request.message)
     return response
 
+@app.post("/chat/stream")
+async def chat_with_ecobot_stream(request: schemas.ChatRequest):
+    """
+    Streaming EcoBot chat over Server-Sent Events.
+    Each `data:` event carries {"delta": "..."}; the stream ends with `event: done`.
+    """
+    async def event_stream():
+        try:
+            async for delta in ai_service.stream_chat_response(request.message):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except Exception as e:
+            print(f"⚠️ Chat stream interrupted: {e}")
+            yield f"event: error\ndata: {json.dumps({'message': 'Stream interrupted. Please try again.'})}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/ai/health")
+def ai_health():
+    """
+    Circuit breaker state and quota bucket fill for each Gemini model, plus cache and request-coalescing stats.
+    """
+    return {
+        "provider": ai_service.provider.name,
+        "models": ai_service.router.snapshot(),
+        "quota": ai_service.router.quota_snapshot(),
+        "verification_cache": ai_service.verification_cache.stats(),
+        "in_flight": {
+            "chat": ai_service.chat_flight.stats(),
+            "verification": ai_service.verify_flight.stats(),
+            "scanner": ai_service.scanner_flight.stats(),
+        },
+        "image_preprocessing": image_pipeline.stats,
+        "verification_jobs": job_queue.stats(),
+    }
+
 # --- AI Verification Route ---
 @app.post("/verify-task")
 async def verify_task(
     file: UploadFile = File(...), 
     task_label: str = Form("nature conservation"),
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_principal_async)
 ):
     print(f"DEBUG: Verifying task for {current_user.username}")
     print(f"DEBUG: Task Label received: {task_label}")
     print(f"DEBUG: Content Type: {file.content_type}")
 
-    # Save file temporarily to handle video processing or large images
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"{current_user.id}_{int(time.time())}_{file.filename}")
-    
+    # Images stay in memory; only large videos spill to the bounded spool dir
+    upload = await uploads.spool_upload(file)
     try:
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        result = await ai_service.verify_task_content(temp_path, file.content_type, task_label)
+        result = await ai_service.verify_task_content(upload, task_label)
         return result
     finally:
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload.cleanup()
 
 # ---------------- IMAGE QUALITY CHECK (Migrated) ----------------
 
 @app.post("/check-image-quality")
 async def check_image_quality(
     file: UploadFile = File(...),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_principal_async)
 ):
     return {"quality_ok": True, "message": "Quality check bypassed (Optimization)"}
 
 @app.post("/eco-scanner")
 async def eco_scanner(
     file: UploadFile = File(...),
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
 ):
     """
     AI Scanner: Identifies an object, gives eco-advice, and awards coins.
     """
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"scan_{current_user.id}_{int(time.time())}_{file.filename}")
-    
+    if not (file.content_type or "").startswith("image/"):
+        raise HTTPException(status_code=400, detail="The Eco-Scanner only accepts images.")
+
+    upload = await uploads.spool_upload(file)
     try:
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
-        result = await ai_service.analyze_eco_object(temp_path, file.content_type)
+        result = await ai_service.analyze_eco_object(upload)
         
         # Award coins if result is valid
         if "points" in result:
-            current_user.coins += int(result["points"])
-            db.commit()
+            await coins.credit_async(db, current_user, int(result["points"]), "eco_scan", result.get("object_name"))
+            await db.commit()
+            on_user_changed(current_user)
             result["new_balance"] = current_user.coins
             
         return result
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload.cleanup()
 
 
 # --- Store Endpoints ---
 @app.get("/store/items", response_model=List[schemas.StoreItemSchema])
-def get_store_items(db: Session = Depends(database.get_db)):
-    return db.query(models.StoreItem).all()
+def get_store_items(request: Request, db: Session = Depends(database.get_db)):
+    def build() -> bytes:
+        return serializers.dumps(serializers.store_items(db))
+
+    payload = store_cache.get_or_build("items", build)
+    return response_cache.cached_json_response(request, payload, response_cache.CATALOG_CACHE_CONTROL)
 
 @app.post("/store/buy")
 def purchase_item(
@@ -303,9 +475,6 @@ def purchase_item(
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
     
-    if current_user.coins < item.price:
-        raise HTTPException(status_code=400, detail="Insufficient EcoCoins")
-    
     # Check if already owned 
     already_owned = db.query(models.UserItem).filter(
         models.UserItem.user_id == current_user.id,
@@ -315,125 +484,254 @@ def purchase_item(
     if already_owned:
         raise HTTPException(status_code=400, detail="You already own this item!")
 
-    # Deduct coins
-    current_user.coins -= item.price
+    # Deduct coins (only if the balance still covers the price when the UPDATE runs)
+    if coins.debit_if_sufficient(db, current_user, item.price, "purchase", f"item:{item.id}") is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Insufficient EcoCoins")
     
     # Log purchase
     user_item = models.UserItem(user_id=current_user.id, item_id=item.id)
     db.add(user_item)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent purchase of the same item won the unique (user_id, item_id) index
+        db.rollback()
+        raise HTTPException(status_code=400, detail="You already own this item!")
     
+    on_user_changed(current_user)
     return {"message": f"Successfully purchased {item.name}!", "new_balance": current_user.coins}
 
 # --- Challenge Endpoints ---
 @app.get("/challenges", response_model=List[schemas.ChallengeSchema])
-def get_challenges(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
-    challenges = db.query(models.Challenge).filter(models.Challenge.is_active == True).all()
-    
-    # Check completion for current user today
+def get_challenges(db: Session = Depends(database.get_db), current_user: auth.Principal = Depends(auth.get_current_principal)):
     today = date.today()
+    # Simplified weekly: check if completed in current week (Mon-Sun)
+    start_of_week = today - timedelta(days=today.weekday())
+
+    # One query: each active challenge joined to the user's latest completion this week
+    last_completion = (
+        select(
+            models.UserChallengeCompletion.challenge_id,
+            func.max(models.UserChallengeCompletion.completion_date).label("last_completed"),
+        )
+        .where(
+            models.UserChallengeCompletion.user_id == current_user.id,
+            models.UserChallengeCompletion.completion_date >= start_of_week,
+        )
+        .group_by(models.UserChallengeCompletion.challenge_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            models.Challenge.id, models.Challenge.title, models.Challenge.description,
+            models.Challenge.coin_reward, models.Challenge.type, models.Challenge.is_active,
+            models.Challenge.verification_label, last_completion.c.last_completed,
+        )
+        .outerjoin(last_completion, last_completion.c.challenge_id == models.Challenge.id)
+        .where(models.Challenge.is_active == True)
+        .order_by(models.Challenge.id)
+    ).all()
+
     results = []
-    for c in challenges:
-        is_completed = False
-        if c.type == 'daily':
-            is_completed = db.query(models.UserChallengeCompletion).filter(
-                models.UserChallengeCompletion.user_id == current_user.id,
-                models.UserChallengeCompletion.challenge_id == c.id,
-                models.UserChallengeCompletion.completion_date == today
-            ).first() is not None
-        elif c.type == 'weekly':
-            # Simplified weekly: check if completed in current week (Sun-Sat or Mon-Sun)
-            start_of_week = today - timedelta(days=today.weekday())
-            is_completed = db.query(models.UserChallengeCompletion).filter(
-                models.UserChallengeCompletion.user_id == current_user.id,
-                models.UserChallengeCompletion.challenge_id == c.id,
-                models.UserChallengeCompletion.completion_date >= start_of_week
-            ).first() is not None
-
-        c_schema = schemas.ChallengeSchema.from_orm(c)
-        c_schema.is_completed = is_completed
-        results.append(c_schema)
+    for row in rows:
+        challenge = row._asdict()
+        last_completed = challenge.pop("last_completed")
+        if row.type == 'daily':
+            challenge["is_completed"] = last_completed == today
+        elif row.type == 'weekly':
+            challenge["is_completed"] = last_completed is not None
+        else:
+            challenge["is_completed"] = False
+        results.append(challenge)
         
     return results
 
+async def find_existing_completion(db: AsyncSession, user_id: int, challenge: models.Challenge):
+    """
+    Returns the user's completion of this challenge for the current day (daily) or week (weekly), if any.
+    """
+    today = date.today()
+    query = select(models.UserChallengeCompletion).where(
+        models.UserChallengeCompletion.user_id == user_id,
+        models.UserChallengeCompletion.challenge_id == challenge.id,
+    )
+    if challenge.type == 'daily':
+        query = query.where(models.UserChallengeCompletion.completion_date == today)
+    else:
+        # weekly
+        start_of_week = today - timedelta(days=today.weekday())
+        query = query.where(models.UserChallengeCompletion.completion_date >= start_of_week)
+    result = await db.execute(query.limit(1))
+    return result.scalars().first()
+
+async def record_challenge_completion(db: AsyncSession, user: models.User, challenge: models.Challenge) -> dict:
+    """
+    Awards the challenge coins, bumps the streak for daily challenges and logs the completion.
+    """
+    # Reward Coins
+    await coins.credit_async(db, user, challenge.coin_reward, "challenge", f"challenge:{challenge.id}")
+    
+    streak_incremented = False
+    if challenge.type == 'daily':
+        apply_streak(user)
+        streak_incremented = True
+    
+    # Log Completion
+    completion = models.UserChallengeCompletion(user_id=user.id, challenge_id=challenge.id)
+    db.add(completion)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent submission already completed it today (unique user/challenge/date index)
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Challenge already completed!")
+    await db.refresh(user)
+    on_user_changed(user)
+    
+    return {
+        "message": f"Challenge '{challenge.title}' Verified & Completed!",
+        "new_balance": user.coins,
+        "streak_incremented": streak_incremented,
+        "new_streak": user.streak
+    }
+
+async def complete_challenge_for_job(user_id: int, challenge_id: int) -> dict:
+    """
+    Finishes a queued challenge verification with its own DB session.
+    """
+    async with database.AsyncSessionLocal() as db:
+        user = await db.get(models.User, user_id)
+        challenge = await db.get(models.Challenge, challenge_id)
+        if not user or not challenge:
+            raise HTTPException(status_code=404, detail="Challenge not found")
+        # Re-check: another submission may have completed it while this job was queued
+        if await find_existing_completion(db, user.id, challenge):
+            raise HTTPException(status_code=400, detail="Challenge already completed!")
+        return await record_challenge_completion(db, user, challenge)
+
 @app.post("/challenges/{challenge_id}/complete", response_model=schemas.ChallengeCompletionResponse)
 async def complete_challenge(
     challenge_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(database.get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: models.User = Depends(auth.get_current_user_async)
 ):
-    challenge = db.query(models.Challenge).filter(models.Challenge.id == challenge_id).first()
+    challenge = await db.get(models.Challenge, challenge_id)
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
-    today = date.today()
-    
     # Check if already completed
-    existing = None
-    if challenge.type == 'daily':
-        existing = db.query(models.UserChallengeCompletion).filter(
-            models.UserChallengeCompletion.user_id == current_user.id,
-            models.UserChallengeCompletion.challenge_id == challenge.id,
-            models.UserChallengeCompletion.completion_date == today
-        ).first()
-    else: # weekly
-        start_of_week = today - timedelta(days=today.weekday())
-        existing = db.query(models.UserChallengeCompletion).filter(
-            models.UserChallengeCompletion.user_id == current_user.id,
-            models.UserChallengeCompletion.challenge_id == challenge.id,
-            models.UserChallengeCompletion.completion_date >= start_of_week
-        ).first()
-
-    if existing:
+    if await find_existing_completion(db, current_user.id, challenge):
         raise HTTPException(status_code=400, detail="Challenge already completed!")
+    # Return the connection to the pool while the upload and AI call run
+    await db.commit()
 
     # --- AI Verification ---
-    temp_dir = "temp_uploads"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"challenge_{challenge_id}_{int(time.time())}_{file.filename}")
-    
+    upload = await uploads.spool_upload(file)
     try:
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-        
         # Use challenge description to match Level Task verification logic (which uses task_description)
         label = challenge.description or challenge.title
-        verification = await ai_service.verify_task_content(temp_path, file.content_type, label)
-        
+        verification = await ai_service.verify_task_content(upload, label)
+
+        if verification.get("busy"):
+             raise HTTPException(status_code=503, detail=verification.get("message"))
         if not verification.get("is_valid"):
              raise HTTPException(status_code=400, detail=f"Verification failed: {verification.get('message')}")
              
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        upload.cleanup()
 
-    # Reward Coins
-    current_user.coins += challenge.coin_reward
-    
-    streak_incremented = False
-    if challenge.type == 'daily':
-        update_user_streak(current_user, db)
-        streak_incremented = True
-    
-    # Log Completion
-    completion = models.UserChallengeCompletion(user_id=current_user.id, challenge_id=challenge.id)
-    db.add(completion)
-    db.commit()
-    db.refresh(current_user)
-    
-    return {
-        "message": f"Challenge '{challenge.title}' Verified & Completed!",
-        "new_balance": current_user.coins,
-        "streak_incremented": streak_incremented,
-        "new_streak": current_user.streak
-    }
+    return await record_challenge_completion(db, current_user, challenge)
+
+# --- Verification Jobs (submit now, poll or stream the result) ---
+
+@app.post("/verify-task/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_verify_task_job(
+    file: UploadFile = File(...),
+    task_label: str = Form("nature conservation"),
+    current_user: auth.Principal = Depends(auth.get_current_principal_async)
+):
+    """
+    Queues a task verification and returns a job id immediately.
+    """
+    upload = await uploads.spool_upload(file)
+
+    async def run():
+        try:
+            return await ai_service.verify_task_content(upload, task_label)
+        finally:
+            upload.cleanup()
+
+    job = job_queue.submit(current_user.id, "task", run, on_discard=upload.cleanup)
+    return job.snapshot()
+
+@app.post("/challenges/{challenge_id}/complete/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_complete_challenge_job(
+    challenge_id: int,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: auth.Principal = Depends(auth.get_current_principal_async)
+):
+    """
+    Queues a challenge verification. Coins and the completion record are
+    written when the job finishes, not when it is submitted.
+    """
+    challenge = await db.get(models.Challenge, challenge_id)
+    if not challenge:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+    if await find_existing_completion(db, current_user.id, challenge):
+        raise HTTPException(status_code=400, detail="Challenge already completed!")
+
+    label = challenge.description or challenge.title
+    user_id = current_user.id
+    upload = await uploads.spool_upload(file)
+
+    async def run():
+        try:
+            verification = await ai_service.verify_task_content(upload, label)
+        finally:
+            upload.cleanup()
+        if verification.get("busy"):
+            raise HTTPException(status_code=503, detail=verification.get("message"))
+        if not verification.get("is_valid"):
+            raise HTTPException(status_code=400, detail=f"Verification failed: {verification.get('message')}")
+        return await complete_challenge_for_job(user_id, challenge_id)
+
+    job = job_queue.submit(user_id, "challenge", run, on_discard=upload.cleanup)
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}")
+def get_verification_job(job_id: str, current_user: auth.Principal = Depends(auth.get_current_principal)):
+    return job_queue.get(job_id, current_user.id).snapshot()
+
+@app.get("/jobs/{job_id}/events")
+async def stream_verification_job(job_id: str, current_user: auth.Principal = Depends(auth.get_current_principal_async)):
+    """
+    Pushes the job's status over Server-Sent Events until it completes or fails.
+    """
+    job = job_queue.get(job_id, current_user.id)
+
+    async def event_stream():
+        while True:
+            yield f"event: status\ndata: {json.dumps(job.snapshot())}\n\n"
+            if job.done:
+                break
+            await job_queue.wait_for_change(job, timeout=15)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # --- Seed Data Endpoint (For Demo) ---
 @app.post("/seed")
 def seed_data(db: Session = Depends(database.get_db)):
-    messages = []
+    """
+    Brings the catalog in line with the data below: one read per table, bulk writes
+    for whatever differs, and a single commit (all or nothing).
+    """
 
     # 1. Seed Levels (Upsert)
     levels_data = [
@@ -454,117 +752,79 @@ def seed_data(db: Session = Depends(database.get_db)):
     # Hardcoded Questions Data (Video 1 -> Level 1, etc.)
     hardcoded_questions = {
         1: [
-            {"text": "Sustainability mainly focuses on meeting the needs of the present without compromising the needs of the _______.", "options": "Government|Past generation|Future generation|Industries", "correct_index": 2, "difficulty": 1, "segment_index": 0},
-            {"text": "Which of the following is not a pillar of sustainability?", "options": "Environmental|Economic|Social|Political", "correct_index": 3, "difficulty": 1, "segment_index": 1},
-            {"text": "Sustainable development promotes _______.", "options": "Unlimited use of resources|Balanced use of resources|Destruction of nature|Use of only non-renewable resources", "correct_index": 1, "difficulty": 1, "segment_index": 2},
-            {"text": "The main goal of sustainability is to maintain _______.", "options": "Pollution|Equity and balance|Overconsumption|Industrial waste", "correct_index": 1, "difficulty": 1, "segment_index": 3},
-            {"text": "“Reduce, Reuse, Recycle” is related to _______.", "options": "Sustainable practices|Entertainment|Agriculture only|Economics", "correct_index": 0, "difficulty": 1, "segment_index": 4},
+            {"text": "Sustainability mainly focuses on meeting the needs of the present without compromising the needs of the _______.", "options": ["Government", "Past generation", "Future generation", "Industries"], "correct_index": 2, "difficulty": 1, "segment_index": 0},
+            {"text": "Which of the following is not a pillar of sustainability?", "options": ["Environmental", "Economic", "Social", "Political"], "correct_index": 3, "difficulty": 1, "segment_index": 1},
+            {"text": "Sustainable development promotes _______.", "options": ["Unlimited use of resources", "Balanced use of resources", "Destruction of nature", "Use of only non-renewable resources"], "correct_index": 1, "difficulty": 1, "segment_index": 2},
+            {"text": "The main goal of sustainability is to maintain _______.", "options": ["Pollution", "Equity and balance", "Overconsumption", "Industrial waste"], "correct_index": 1, "difficulty": 1, "segment_index": 3},
+            {"text": "“Reduce, Reuse, Recycle” is related to _______.", "options": ["Sustainable practices", "Entertainment", "Agriculture only", "Economics"], "correct_index": 0, "difficulty": 1, "segment_index": 4},
         ],
         2: [
-            {"text": "Environmental sustainability aims to _______.", "options": "Increase pollution|Protect natural ecosystems|Promote waste generation|Use unlimited resources", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-            {"text": "Which action supports environmental sustainability?", "options": "Burning plastic|Deforestation|Using renewable energy|Excessive mining", "correct_index": 2, "difficulty": 1, "segment_index": 1},
-            {"text": "Which gas causes ozone depletion?", "options": "Oxygen|Chlorofluorocarbons (CFCs)|Nitrogen|Helium", "correct_index": 1, "difficulty": 1, "segment_index": 2},
-            {"text": "Planting trees helps in _______.", "options": "Increasing CO₂|Reducing air pollution|Increasing soil erosion|Reducing biodiversity", "correct_index": 1, "difficulty": 1, "segment_index": 3},
-            {"text": "Environmental sustainability encourages _______.", "options": "Short-term benefits|Long-term ecological balance|Overuse of natural resources|Pollution increase", "correct_index": 1, "difficulty": 1, "segment_index": 4},
+            {"text": "Environmental sustainability aims to _______.", "options": ["Increase pollution", "Protect natural ecosystems", "Promote waste generation", "Use unlimited resources"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+            {"text": "Which action supports environmental sustainability?", "options": ["Burning plastic", "Deforestation", "Using renewable energy", "Excessive mining"], "correct_index": 2, "difficulty": 1, "segment_index": 1},
+            {"text": "Which gas causes ozone depletion?", "options": ["Oxygen", "Chlorofluorocarbons (CFCs)", "Nitrogen", "Helium"], "correct_index": 1, "difficulty": 1, "segment_index": 2},
+            {"text": "Planting trees helps in _______.", "options": ["Increasing CO₂", "Reducing air pollution", "Increasing soil erosion", "Reducing biodiversity"], "correct_index": 1, "difficulty": 1, "segment_index": 3},
+            {"text": "Environmental sustainability encourages _______.", "options": ["Short-term benefits", "Long-term ecological balance", "Overuse of natural resources", "Pollution increase"], "correct_index": 1, "difficulty": 1, "segment_index": 4},
         ],
         3: [
-            {"text": "Which of the following is a renewable natural resource?", "options": "Coal|Petroleum|Solar energy|Natural gas", "correct_index": 2, "difficulty": 1, "segment_index": 0},
-            {"text": "Forests are an example of _______.", "options": "Man-made resource|Natural resource|Artificial resource|Mechanical resource", "correct_index": 1, "difficulty": 1, "segment_index": 1},
-            {"text": "Which is an example of a non-renewable resource?", "options": "Wind|Water|Sunlight|Coal", "correct_index": 3, "difficulty": 1, "segment_index": 2},
-            {"text": "Natural resources are classified into _______.", "options": "Biotic and abiotic|Electric and magnetic|Natural and artificial|Living and man-made", "correct_index": 0, "difficulty": 1, "segment_index": 3},
-            {"text": "Overuse of natural resources leads to _______.", "options": "Resource conservation|Resource depletion|More biodiversity|Less pollution", "correct_index": 1, "difficulty": 1, "segment_index": 4},
+            {"text": "Which of the following is a renewable natural resource?", "options": ["Coal", "Petroleum", "Solar energy", "Natural gas"], "correct_index": 2, "difficulty": 1, "segment_index": 0},
+            {"text": "Forests are an example of _______.", "options": ["Man-made resource", "Natural resource", "Artificial resource", "Mechanical resource"], "correct_index": 1, "difficulty": 1, "segment_index": 1},
+            {"text": "Which is an example of a non-renewable resource?", "options": ["Wind", "Water", "Sunlight", "Coal"], "correct_index": 3, "difficulty": 1, "segment_index": 2},
+            {"text": "Natural resources are classified into _______.", "options": ["Biotic and abiotic", "Electric and magnetic", "Natural and artificial", "Living and man-made"], "correct_index": 0, "difficulty": 1, "segment_index": 3},
+            {"text": "Overuse of natural resources leads to _______.", "options": ["Resource conservation", "Resource depletion", "More biodiversity", "Less pollution"], "correct_index": 1, "difficulty": 1, "segment_index": 4},
         ],
         4: [
-            {"text": "The 3R’s help in reducing _______.", "options": "Pollution|Education|Transportation|Technology", "correct_index": 0, "difficulty": 1, "segment_index": 0},
-            {"text": "Which of the following is an example of reusing?", "options": "Throwing old jars|Using plastic bags again|Burning waste|Mining metals", "correct_index": 1, "difficulty": 1, "segment_index": 1},
-            {"text": "Recycling involves _______.", "options": "Using products again without change|Making new products from waste materials|Reducing energy use|Buying new items", "correct_index": 1, "difficulty": 1, "segment_index": 2},
-            {"text": "Reduce means _______.", "options": "Using more products|Using less and avoiding waste|Throwing everything|Burning items", "correct_index": 1, "difficulty": 1, "segment_index": 3},
-            {"text": "Which of the following can be recycled?", "options": "Glass|Food|Soil|Air", "correct_index": 0, "difficulty": 1, "segment_index": 4},
+            {"text": "The 3R’s help in reducing _______.", "options": ["Pollution", "Education", "Transportation", "Technology"], "correct_index": 0, "difficulty": 1, "segment_index": 0},
+            {"text": "Which of the following is an example of reusing?", "options": ["Throwing old jars", "Using plastic bags again", "Burning waste", "Mining metals"], "correct_index": 1, "difficulty": 1, "segment_index": 1},
+            {"text": "Recycling involves _______.", "options": ["Using products again without change", "Making new products from waste materials", "Reducing energy use", "Buying new items"], "correct_index": 1, "difficulty": 1, "segment_index": 2},
+            {"text": "Reduce means _______.", "options": ["Using more products", "Using less and avoiding waste", "Throwing everything", "Burning items"], "correct_index": 1, "difficulty": 1, "segment_index": 3},
+            {"text": "Which of the following can be recycled?", "options": ["Glass", "Food", "Soil", "Air"], "correct_index": 0, "difficulty": 1, "segment_index": 4},
         ],
         5: [
-            {"text": "Global warming mainly refers to _______.", "options": "Cooling of the Earth|Increase in Earth's average temperature|Increase in rainfall|Formation of glaciers", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-            {"text": "Which gas is the major contributor to global warming?", "options": "O₂|N₂|CO₂|He", "correct_index": 2, "difficulty": 1, "segment_index": 1},
-            {"text": "Which human activity increases global warming?", "options": "Planting trees|Burning fossil fuels|Using solar power|Water harvesting", "correct_index": 1, "difficulty": 1, "segment_index": 2},
-            {"text": "Polar ice melting is a result of _______.", "options": "Deforestation|Earthquakes|Global warming|Soil erosion", "correct_index": 2, "difficulty": 1, "segment_index": 3},
-            {"text": "Which of the following is a consequence of global warming?", "options": "Stable climate|Rise in sea level|Decrease in temperature|More snowfall everywhere", "correct_index": 1, "difficulty": 1, "segment_index": 4},
+            {"text": "Global warming mainly refers to _______.", "options": ["Cooling of the Earth", "Increase in Earth's average temperature", "Increase in rainfall", "Formation of glaciers"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+            {"text": "Which gas is the major contributor to global warming?", "options": ["O₂", "N₂", "CO₂", "He"], "correct_index": 2, "difficulty": 1, "segment_index": 1},
+            {"text": "Which human activity increases global warming?", "options": ["Planting trees", "Burning fossil fuels", "Using solar power", "Water harvesting"], "correct_index": 1, "difficulty": 1, "segment_index": 2},
+            {"text": "Polar ice melting is a result of _______.", "options": ["Deforestation", "Earthquakes", "Global warming", "Soil erosion"], "correct_index": 2, "difficulty": 1, "segment_index": 3},
+            {"text": "Which of the following is a consequence of global warming?", "options": ["Stable climate", "Rise in sea level", "Decrease in temperature", "More snowfall everywhere"], "correct_index": 1, "difficulty": 1, "segment_index": 4},
         ],
         
         # Questions for Levels 6-10 (from n2)
         6: [
-           {"text": "What is the primary cause of deforestation mentioned?", "options": "Agriculture|Urbanization|Mining|Tourism", "correct_index": 0, "difficulty": 1, "segment_index": 0},
-           {"text": "Which gas do trees absorb from the atmosphere?", "options": "Oxygen|Carbon Dioxide|Nitrogen|Helium", "correct_index": 1, "difficulty": 2, "segment_index": 1},
-           {"text": "What happens to the soil when trees are removed?", "options": "It becomes richer|It erodes easily|It changes color|Nothing", "correct_index": 1, "difficulty": 3, "segment_index": 2},
-           {"text": "Deforestation leads to the loss of habitat for what percentage of land animals?", "options": "10%|50%|80%|100%", "correct_index": 2, "difficulty": 4, "segment_index": 3},
-           {"text": "Which strategy was suggested to combat deforestation?", "options": "Buying more paper|Reforestation|Building roads|Ignoring it", "correct_index": 1, "difficulty": 5, "segment_index": 4},
+           {"text": "What is the primary cause of deforestation mentioned?", "options": ["Agriculture", "Urbanization", "Mining", "Tourism"], "correct_index": 0, "difficulty": 1, "segment_index": 0},
+           {"text": "Which gas do trees absorb from the atmosphere?", "options": ["Oxygen", "Carbon Dioxide", "Nitrogen", "Helium"], "correct_index": 1, "difficulty": 2, "segment_index": 1},
+           {"text": "What happens to the soil when trees are removed?", "options": ["It becomes richer", "It erodes easily", "It changes color", "Nothing"], "correct_index": 1, "difficulty": 3, "segment_index": 2},
+           {"text": "Deforestation leads to the loss of habitat for what percentage of land animals?", "options": ["10%", "50%", "80%", "100%"], "correct_index": 2, "difficulty": 4, "segment_index": 3},
+           {"text": "Which strategy was suggested to combat deforestation?", "options": ["Buying more paper", "Reforestation", "Building roads", "Ignoring it"], "correct_index": 1, "difficulty": 5, "segment_index": 4},
         ],
         7: [
-           {"text": "What is the main source of water pollution?", "options": "Fish|Industrial Waste|Rain|Sunlight", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-           {"text": "Why shouldn't you throw plastic in the river?", "options": "It floats|Animals eat it and die|It looks ugly|It melts", "correct_index": 1, "difficulty": 2, "segment_index": 1},
-           {"text": "What is 'runoff'?", "options": "Running fast|Water washing chemicals into rivers|A type of boat|A river race", "correct_index": 1, "difficulty": 3, "segment_index": 2},
-           {"text": "Which percentage of Earth's water is fresh and drinkable?", "options": "75%|50%|2.5%|10%", "correct_index": 2, "difficulty": 4, "segment_index": 3},
-           {"text": "What can you do at home to save water?", "options": "Leave tap open|Fix leaks|Take long showers|Wash cars daily", "correct_index": 1, "difficulty": 5, "segment_index": 4},
+           {"text": "What is the main source of water pollution?", "options": ["Fish", "Industrial Waste", "Rain", "Sunlight"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+           {"text": "Why shouldn't you throw plastic in the river?", "options": ["It floats", "Animals eat it and die", "It looks ugly", "It melts"], "correct_index": 1, "difficulty": 2, "segment_index": 1},
+           {"text": "What is 'runoff'?", "options": ["Running fast", "Water washing chemicals into rivers", "A type of boat", "A river race"], "correct_index": 1, "difficulty": 3, "segment_index": 2},
+           {"text": "Which percentage of Earth's water is fresh and drinkable?", "options": ["75%", "50%", "2.5%", "10%"], "correct_index": 2, "difficulty": 4, "segment_index": 3},
+           {"text": "What can you do at home to save water?", "options": ["Leave tap open", "Fix leaks", "Take long showers", "Wash cars daily"], "correct_index": 1, "difficulty": 5, "segment_index": 4},
         ],
         8: [
-           {"text": "What is the 3R rule?", "options": "Run, Rest, Repeat|Reduce, Reuse, Recycle|Read, Write, React|Red, Rose, Ruby", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-           {"text": "Which bin is usually for recycling?", "options": "Black|Blue/Green|Red|Invisible", "correct_index": 1, "difficulty": 2, "segment_index": 1},
-           {"text": "What is 'composting'?", "options": "Burning trash|Turning food waste into soil|Throwing food in river|Painting", "correct_index": 1, "difficulty": 3, "segment_index": 2},
-           {"text": "How do sustainable cities reduce traffic?", "options": "More cars|Public transport & biking|Closing roads|Flying cars", "correct_index": 1, "difficulty": 4, "segment_index": 3},
-           {"text": "What is a 'vertical garden'?", "options": "Plants on walls|Plants on ceilings|Plants in space|Fake plants", "correct_index": 0, "difficulty": 5, "segment_index": 4},
+           {"text": "What is the 3R rule?", "options": ["Run, Rest, Repeat", "Reduce, Reuse, Recycle", "Read, Write, React", "Red, Rose, Ruby"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+           {"text": "Which bin is usually for recycling?", "options": ["Black", "Blue/Green", "Red", "Invisible"], "correct_index": 1, "difficulty": 2, "segment_index": 1},
+           {"text": "What is 'composting'?", "options": ["Burning trash", "Turning food waste into soil", "Throwing food in river", "Painting"], "correct_index": 1, "difficulty": 3, "segment_index": 2},
+           {"text": "How do sustainable cities reduce traffic?", "options": ["More cars", "Public transport & biking", "Closing roads", "Flying cars"], "correct_index": 1, "difficulty": 4, "segment_index": 3},
+           {"text": "What is a 'vertical garden'?", "options": ["Plants on walls", "Plants on ceilings", "Plants in space", "Fake plants"], "correct_index": 0, "difficulty": 5, "segment_index": 4},
         ],
         9: [
-           {"text": "Which of these is a renewable energy source?", "options": "Coal|Solar|Oil|Gas", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-           {"text": "What captures energy from the wind?", "options": "Solar Panels|Turbines|Mirrors|Dams", "correct_index": 1, "difficulty": 2, "segment_index": 1},
-           {"text": "Why are fossil fuels bad for the climate?", "options": "They smell|They release greenhouse gases|They differ in color|They are cold", "correct_index": 1, "difficulty": 3, "segment_index": 2},
-           {"text": "What energy comes from the Earth's heat?", "options": "Geothermal|Hydro|Biomass|Nuclear", "correct_index": 0, "difficulty": 4, "segment_index": 3},
-           {"text": "Which country runs almost 100% on renewable energy (example)?", "options": "Iceland|USA|Mars|Atlantis", "correct_index": 0, "difficulty": 5, "segment_index": 4},
+           {"text": "Which of these is a renewable energy source?", "options": ["Coal", "Solar", "Oil", "Gas"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+           {"text": "What captures energy from the wind?", "options": ["Solar Panels", "Turbines", "Mirrors", "Dams"], "correct_index": 1, "difficulty": 2, "segment_index": 1},
+           {"text": "Why are fossil fuels bad for the climate?", "options": ["They smell", "They release greenhouse gases", "They differ in color", "They are cold"], "correct_index": 1, "difficulty": 3, "segment_index": 2},
+           {"text": "What energy comes from the Earth's heat?", "options": ["Geothermal", "Hydro", "Biomass", "Nuclear"], "correct_index": 0, "difficulty": 4, "segment_index": 3},
+           {"text": "Which country runs almost 100% on renewable energy (example)?", "options": ["Iceland", "USA", "Mars", "Atlantis"], "correct_index": 0, "difficulty": 5, "segment_index": 4},
         ],
         10: [
-           {"text": "What is the 'Greenhouse Effect'?", "options": "Growing plants|Trapping heat in atmosphere|Painting houses green|Cooling the earth", "correct_index": 1, "difficulty": 1, "segment_index": 0},
-           {"text": "What is the main gas causing global warming?", "options": "Oxygen|Carbon Dioxide|Helium|Neon", "correct_index": 1, "difficulty": 2, "segment_index": 1},
-           {"text": "Rising sea levels are caused by...", "options": "More rain|Melting ice caps|Too many boats|Fish", "correct_index": 1, "difficulty": 3, "segment_index": 2},
-           {"text": "What is a 'Carbon Footprint'?", "options": "Total greenhouse gas emissions by a person|A dirty shoe|Coal dust|Graphite", "correct_index": 0, "difficulty": 4, "segment_index": 3},
-           {"text": "What is the global target limit for warming?", "options": "1.5°C|10°C|50°C|0°C", "correct_index": 0, "difficulty": 5, "segment_index": 4},
+           {"text": "What is the 'Greenhouse Effect'?", "options": ["Growing plants", "Trapping heat in atmosphere", "Painting houses green", "Cooling the earth"], "correct_index": 1, "difficulty": 1, "segment_index": 0},
+           {"text": "What is the main gas causing global warming?", "options": ["Oxygen", "Carbon Dioxide", "Helium", "Neon"], "correct_index": 1, "difficulty": 2, "segment_index": 1},
+           {"text": "Rising sea levels are caused by...", "options": ["More rain", "Melting ice caps", "Too many boats", "Fish"], "correct_index": 1, "difficulty": 3, "segment_index": 2},
+           {"text": "What is a 'Carbon Footprint'?", "options": ["Total greenhouse gas emissions by a person", "A dirty shoe", "Coal dust", "Graphite"], "correct_index": 0, "difficulty": 4, "segment_index": 3},
+           {"text": "What is the global target limit for warming?", "options": ["1.5°C", "10°C", "50°C", "0°C"], "correct_index": 0, "difficulty": 5, "segment_index": 4},
         ]
     }
-            
-    for l in levels_data:
-        existing_level = db.query(models.Level).filter(models.Level.order == l["order"]).first()
-        
-        # Determine questions for this level
-        level_questions = hardcoded_questions.get(l["order"], [])
-
-        if existing_level:
-            # Update existing level
-            existing_level.title = l["title"]
-            existing_level.description = l["description"]
-            existing_level.video_id = l["video_id"]
-            existing_level.info_content = l["info_content"]
-            existing_level.task_description = l["task_description"]
-            existing_level.theme_id = l["theme_id"]
-            existing_level.xp_reward = l["xp_reward"]
-            
-            # Use hardcoded questions
-            if level_questions:
-                # Remove old questions
-                db.query(models.Question).filter(models.Question.level_id == existing_level.id).delete()
-                for q in level_questions:
-                    db_q = models.Question(level_id=existing_level.id, **q)
-                    db.add(db_q)
-
-        else:
-            db_level = models.Level(**l)
-            db.add(db_level)
-            db.flush() # Get ID
-            
-            # Add Questions
-            if level_questions:
-                for q in level_questions:
-                    db_q = models.Question(level_id=db_level.id, **q)
-                    db.add(db_q)
-    
-    messages.append("Levels and Questions seeded/updated.")
 
-    
     # 2. Seed Store Items (Update if exists)
     store_items = [
         {"name": "Plant a Tree", "description": "We will plant a real tree in your name.", "price": 1000, "icon_type": "tree", "category": "Symbolic", "image_url": "/image/store/tree.jpeg"},
@@ -579,44 +839,88 @@ def seed_data(db: Session = Depends(database.get_db)):
         {"name": "Recycled Notebooks", "description": "A set of premium recycled paper notebooks.", "price": 350, "icon_type": "book", "category": "Student", "image_url": "/image/store/notebooks.jpeg"},
     ]
     
-    for item in store_items:
-        existing = db.query(models.StoreItem).filter(models.StoreItem.name == item["name"]).first()
-        if existing:
-            existing.image_url = item["image_url"]
-            existing.description = item["description"]
-            existing.price = item["price"]
-            existing.category = item["category"]
-            existing.icon_type = item["icon_type"]
-        else:
-            db_item = models.StoreItem(**item)
-            db.add(db_item)
-    messages.append("Store Items seeded/updated.")
-
     # 3. Seed Challenges
-    if db.query(models.Challenge).count() == 0:
-        challenges_data = [
-            {"title": "Nature Appreciation", "description": "Find a tree and take a photo to show you appreciate nature!", "coin_reward": 20, "type": "daily", "verification_label": "tree, plant, green nature, leaves"},
-            {"title": "Water Saver", "description": "Limit your shower to 5 minutes.", "coin_reward": 20, "type": "daily", "verification_label": "shower timer or water saving fixture"},
-            {"title": "Weekly Cleanup", "description": "Clean up a local park or street for 1 hour.", "coin_reward": 20, "type": "weekly", "verification_label": "person collecting trash outdoors with a bag"},
-            {"title": "Vegetarian Week", "description": "Eat no meat for a full week.", "coin_reward": 20, "type": "weekly", "verification_label": "vegetarian meal without any meat"},
-        ]
-        for c in challenges_data:
-            db_challenge = models.Challenge(**c)
-            db.add(db_challenge)
-        messages.append("Challenges seeded.")
-    else:
-        messages.append("Challenges already exist.")
+    challenges_data = [
+        {"title": "Nature Appreciation", "description": "Find a tree and take a photo to show you appreciate nature!", "coin_reward": 20, "type": "daily", "verification_label": "tree, plant, green nature, leaves"},
+        {"title": "Water Saver", "description": "Limit your shower to 5 minutes.", "coin_reward": 20, "type": "daily", "verification_label": "shower timer or water saving fixture"},
+        {"title": "Weekly Cleanup", "description": "Clean up a local park or street for 1 hour.", "coin_reward": 20, "type": "weekly", "verification_label": "person collecting trash outdoors with a bag"},
+        {"title": "Vegetarian Week", "description": "Eat no meat for a full week.", "coin_reward": 20, "type": "weekly", "verification_label": "vegetarian meal without any meat"},
+    ]
 
-    db.commit()
-    return {"message": " / ".join(messages)}
+    try:
+        counts = seeding.seed_levels(db, levels_data, hardcoded_questions)
+        counts["store_items"] = seeding.sync_table(db, models.StoreItem, ("name",), store_items)
+        # Challenges are only added, never overwritten: their rewards are tuned live (update_challenges.py)
+        counts["challenges"] = seeding.sync_table(
+            db, models.Challenge, ("title",), challenges_data,
+            insert_only=("description", "coin_reward", "type", "verification_label"),
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if seeding.changed(counts["levels"]) or seeding.changed(counts["questions"]):
+        levels_cache.invalidate()
+        quiz_cache.invalidate()
+    if seeding.changed(counts["store_items"]):
+        store_cache.invalidate()
+    return {"message": seeding.summary(counts), "counts": counts}
 
 # --- Community Feed Routes ---
+# Compatibility mode: the unpaginated list, capped to the newest posts
+FEED_COMPAT_LIMIT = int(os.getenv("FEED_COMPAT_LIMIT", 100))
+FEED_PAGE_MAX = 100
+
 @app.get("/community-feed", response_model=List[schemas.CommunityFeedSchema])
-def get_community_feed(db: Session = Depends(database.get_db)):
-    return db.query(models.CommunityFeed).order_by(models.CommunityFeed.created_at.desc()).all()
+def get_community_feed(request: Request, db: Session = Depends(database.get_db)):
+    def build() -> bytes:
+        rows = db.execute(serializers.feed_select().limit(FEED_COMPAT_LIMIT)).all()
+        return serializers.dumps(serializers.rows_to_dicts(rows, serializers.FEED_COLUMNS))
 
+    payload = feed_cache.get_or_build("feed", build)
+    return response_cache.cached_json_response(request, payload, response_cache.CATALOG_CACHE_CONTROL)
+
+def encode_feed_cursor(post) -> str:
+    raw = json.dumps([post.created_at.isoformat(), post.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_feed_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@app.get("/community-feed/page", response_model=schemas.CommunityFeedPage)
+def get_community_feed_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=FEED_PAGE_MAX),
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    """
+    Newest posts first, one page at a time. Keyset pagination on (created_at, id):
+    each page is an index range scan no matter how deep the client has scrolled.
+    """
+    query = serializers.feed_select(category, location)
+    if cursor:
+        created_at, post_id = decode_feed_cursor(cursor)
+        query = query.where(
+            tuple_(models.CommunityFeed.created_at, models.CommunityFeed.id) < tuple_(created_at, post_id)
+        )
+
+    # One extra row tells us whether there is a next page
+    rows = db.execute(query.limit(limit + 1)).all()
+    next_cursor = encode_feed_cursor(rows[limit - 1]) if len(rows) > limit else None
+    # Rows go straight to orjson; response_model only documents the shape
+    return ORJSONResponse({
+        "items": serializers.rows_to_dicts(rows[:limit], serializers.FEED_COLUMNS),
+        "next_cursor": next_cursor,
+    })
 
-# --- Update Seed Data for Community Feed ---
 @app.post("/seed-full")
 def seed_full_data(db: Session = Depends(database.get_db)):
     # Call original seed logic (simplified by calling functions or just re-implementing relevant parts if needed)
@@ -628,69 +932,69 @@ def seed_full_data(db: Session = Depends(database.get_db)):
     # But replacing a large block is risky.
     # I will CREATE a separate seed-community endpoint for safety and clarity, then user can call it.
     
-    messages = []
+    feed_data = [
+        {
+            "title": "City Green Drive",
+            "category": "Greenery",
+            "location": "New York, NY",
+            "description": "Join us for a weekend tree plantation drive at Central Park.",
+            "external_link": "https://www.nycparks.org",
+            "created_at": date.today()
+        },
+        {
+            "title": "Ocean Cleanup Initiative",
+            "category": "Water",
+            "location": "San Francisco, CA",
+            "description": "Volunteer to clean up the beaches and protect marine life.",
+            "external_link": "https://theoceancleanup.com",
+            "created_at": date.today() - timedelta(days=2)
+        },
+        {
+            "title": "Solar for Schools",
+            "category": "Energy",
+            "location": "Austin, TX",
+            "description": "Help install solar panels in local public schools.",
+            "external_link": "https://solarforeveryone.org",
+            "created_at": date.today() - timedelta(days=5)
+        },
+        {
+            "title": "Zero Waste Workshop",
+            "category": "Waste",
+            "location": "Seattle, WA",
+            "description": "Learn how to reduce your daily waste to zero with experts.",
+            "external_link": "https://zerowaste.org",
+            "created_at": date.today() - timedelta(days=1)
+        },
+         {
+            "title": "Community Composting",
+            "category": "Waste",
+            "location": "Portland, OR",
+            "description": "Turn your kitchen scraps into rich soil for community gardens.",
+            "external_link": "https://portlandcomposts.org",
+            "created_at": date.today() - timedelta(days=3)
+        }
+    ]
     
-    if db.query(models.CommunityFeed).count() == 0:
-        feed_data = [
-            {
-                "title": "City Green Drive",
-                "category": "Greenery",
-                "location": "New York, NY",
-                "description": "Join us for a weekend tree plantation drive at Central Park.",
-                "external_link": "https://www.nycparks.org",
-                "created_at": date.today()
-            },
-            {
-                "title": "Ocean Cleanup Initiative",
-                "category": "Water",
-                "location": "San Francisco, CA",
-                "description": "Volunteer to clean up the beaches and protect marine life.",
-                "external_link": "https://theoceancleanup.com",
-                "created_at": date.today() - timedelta(days=2)
-            },
-            {
-                "title": "Solar for Schools",
-                "category": "Energy",
-                "location": "Austin, TX",
-                "description": "Help install solar panels in local public schools.",
-                "external_link": "https://solarforeveryone.org",
-                "created_at": date.today() - timedelta(days=5)
-            },
-            {
-                "title": "Zero Waste Workshop",
-                "category": "Waste",
-                "location": "Seattle, WA",
-                "description": "Learn how to reduce your daily waste to zero with experts.",
-                "external_link": "https://zerowaste.org",
-                "created_at": date.today() - timedelta(days=1)
-            },
-             {
-                "title": "Community Composting",
-                "category": "Waste",
-                "location": "Portland, OR",
-                "description": "Turn your kitchen scraps into rich soil for community gardens.",
-                "external_link": "https://portlandcomposts.org",
-                "created_at": date.today() - timedelta(days=3)
-            }
-        ]
-        
-        for item in feed_data:
-            feed_item = models.CommunityFeed(**item)
-            db.add(feed_item)
-        
+    try:
+        # Posts are matched by title; created_at is only set when a post is first added
+        counts = {"community_feed": seeding.sync_table(
+            db, models.CommunityFeed, ("title",), feed_data, insert_only=("created_at",)
+        )}
         db.commit()
-        messages.append("Community Feed seeded.")
-    else:
-        messages.append("Community Feed already exists.")
+    except Exception:
+        db.rollback()
+        raise
 
-    return {"message": " ".join(messages)}
+    if seeding.changed(counts["community_feed"]):
+        feed_cache.invalidate()
+    return {"message": seeding.summary(counts), "counts": counts}
 
 
 @app.post("/contact")
-async def create_ngo_request(request: schemas.NGORequestCreate, db: Session = Depends(database.get_db)):
+async def create_ngo_request(request: schemas.NGORequestCreate, db: AsyncSession = Depends(database.get_async_db)):
     new_request = models.NGORequest(**request.dict())
     db.add(new_request)
-    db.commit()
+    await db.commit()
     
     # Send Email
     try:
@@ -0,0 +1,128 @@
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, String, insert, inspect, literal, select, text
+import models
+
+# Startup migrations for databases created before the current schema.
+# `create_all` only creates missing tables, so indexes added to existing tables
+# (see the __table_args__ in models.py) are created here instead. Unique indexes
+# can't be built over duplicate rows, so those are merged or removed first.
+
+STATUS_RANK = {"locked": 0, "unlocked": 1, "completed": 2}
+
+# Unique index name -> (table, key columns) for tables whose duplicates are simply dropped
+DEDUPE_KEYS = {
+    "ux_user_items_user_item": ("user_items", ["user_id", "item_id"]),
+    "ux_challenge_completions_user_challenge_date": (
+        "user_challenge_completions", ["user_id", "challenge_id", "completion_date"]
+    ),
+}
+
+
+def _existing_indexes(conn, table: str) -> set:
+    return {index["name"] for index in inspect(conn).get_indexes(table)}
+
+
+def _drop_duplicates(conn, table: str, columns: list) -> int:
+    """
+    Keeps the oldest row (lowest id) of each duplicate group.
+    """
+    key = ", ".join(columns)
+    # The derived table keeps MySQL happy (it can't select from the table it deletes from)
+    result = conn.execute(text(
+        f"DELETE FROM {table} WHERE id NOT IN "
+        f"(SELECT id FROM (SELECT MIN(id) AS id FROM {table} GROUP BY {key}) AS keep)"
+    ))
+    return result.rowcount
+
+
+def _merge_duplicate_progress(conn) -> int:
+    """
+    Collapses duplicate (user_id, level_id) progress rows into the oldest one,
+    keeping the furthest status and the best score.
+    """
+    groups = conn.execute(text(
+        "SELECT user_id, level_id FROM user_progress GROUP BY user_id, level_id HAVING COUNT(*) > 1"
+    )).all()
+    removed = 0
+    for user_id, level_id in groups:
+        rows = conn.execute(text(
+            "SELECT id, status, score FROM user_progress WHERE user_id = :user_id AND level_id = :level_id ORDER BY id"
+        ), {"user_id": user_id, "level_id": level_id}).all()
+        keep_id = rows[0].id
+        status = max((row.status for row in rows), key=lambda s: STATUS_RANK.get(s, 0))
+        score = max(row.score or 0 for row in rows)
+        conn.execute(text("UPDATE user_progress SET status = :status, score = :score WHERE id = :id"),
+                     {"status": status, "score": score, "id": keep_id})
+        result = conn.execute(text(
+            "DELETE FROM user_progress WHERE user_id = :user_id AND level_id = :level_id AND id != :id"
+        ), {"user_id": user_id, "level_id": level_id, "id": keep_id})
+        removed += result.rowcount
+    return removed
+
+
+def _backfill_opening_balances(conn) -> int:
+    """
+    Gives existing users an 'opening_balance' ledger entry for the coins they had
+    before the ledger existed, so balances reconcile. Only runs while the ledger is empty.
+    """
+    if conn.execute(select(models.CoinLedger.id).limit(1)).first():
+        return 0
+    users = models.User.__table__
+    result = conn.execute(
+        insert(models.CoinLedger.__table__).from_select(
+            ["user_id", "delta", "balance_after", "reason", "created_at"],
+            select(users.c.id, users.c.coins, users.c.coins,
+                   literal("opening_balance", String), literal(datetime.utcnow(), DateTime))
+            .where(users.c.coins.is_not(None), users.c.coins != 0),
+        )
+    )
+    return result.rowcount
+
+
+def _convert_question_options(conn) -> int:
+    """
+    Rewrites pipe-delimited options ("A|B|C|D") as JSON lists (["A", "B", "C", "D"]).
+    """
+    rows = conn.execute(text(
+        "SELECT id, options FROM questions WHERE options IS NOT NULL AND options NOT LIKE '[%'"
+    )).all()
+    if rows:
+        conn.execute(
+            text("UPDATE questions SET options = :options WHERE id = :id"),
+            [{"id": row.id, "options": json.dumps(row.options.split("|"))} for row in rows],
+        )
+    return len(rows)
+
+
+def run_migrations(engine):
+    """
+    Idempotent: safe to run on every startup, a no-op once the indexes exist.
+    """
+    with engine.begin() as conn:
+        progress_indexes = _existing_indexes(conn, "user_progress")
+        if "ux_user_progress_user_level" not in progress_indexes:
+            removed = _merge_duplicate_progress(conn)
+            if removed:
+                print(f"🔧 Migration: merged {removed} duplicate user_progress rows")
+
+        for index_name, (table, columns) in DEDUPE_KEYS.items():
+            if index_name not in _existing_indexes(conn, table):
+                removed = _drop_duplicates(conn, table, columns)
+                if removed:
+                    print(f"🔧 Migration: removed {removed} duplicate {table} rows")
+
+        converted = _convert_question_options(conn)
+        if converted:
+            print(f"🔧 Migration: converted options of {converted} questions to JSON lists")
+
+        opened = _backfill_opening_balances(conn)
+        if opened:
+            print(f"🔧 Migration: recorded opening coin balances for {opened} users")
+
+        for table in models.Base.metadata.sorted_tables:
+            existing = _existing_indexes(conn, table.name)
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    print(f"🔧 Migration: created index {index.name}")
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from quota_governor import QuotaGovernor, PRIORITY_CHAT, PRIORITY_NAMES
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+load_dotenv()
+
+T = TypeVar("T")
+
+# --- Router Configuration ---
+# Seconds a breaker stays open after a quota (429) error before a trial call is allowed
+QUOTA_COOLDOWN_SECONDS = float(os.getenv("AI_QUOTA_COOLDOWN_SECONDS", 60))
+# Seconds a breaker stays open after repeated ordinary failures
+FAILURE_COOLDOWN_SECONDS = float(os.getenv("AI_FAILURE_COOLDOWN_SECONDS", 15))
+# Consecutive ordinary failures before a breaker opens
+FAILURE_THRESHOLD = int(os.getenv("AI_FAILURE_THRESHOLD", 3))
+# Base async backoff between failed models (doubles per attempt, capped)
+BACKOFF_BASE_SECONDS = float(os.getenv("AI_BACKOFF_BASE_SECONDS", 0.25))
+BACKOFF_MAX_SECONDS = float(os.getenv("AI_BACKOFF_MAX_SECONDS", 2.0))
+
+
+def is_quota_error(error) -> bool:
+    error_str = str(error)
+    return "429" in error_str or "quota" in error_str.lower()
+
+
+class AllModelsFailedError(Exception):
+    """
+    Raised when every model in the failover list failed or was skipped by its breaker.
+    """
+    def __init__(self, last_error: Optional[str], quota_error_hit: bool):
+        super().__init__(last_error or "All models failed")
+        self.last_error = last_error
+        self.quota_error_hit = quota_error_hit
+
+
+class LoadShedError(AllModelsFailedError):
+    """
+    Raised when the local quota governor shed the call before any model answered.
+    Unlike a provider quota error (quota_error_hit), nothing was rejected upstream:
+    the server is simply busy, and the caller should be asked to retry.
+    """
+    def __init__(self, last_error: Optional[str] = None):
+        super().__init__(last_error or "Local quota budget exhausted", quota_error_hit=False)
+
+
+class CircuitBreaker:
+    """
+    Health state for a single model.
+    closed -> calls flow; open -> calls skipped until the cooldown ends;
+    half_open -> one trial call decides whether to close or re-open.
+    """
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_until = 0.0
+        self.last_error: Optional[str] = None
+        self.trial_in_flight = False
+        self.successes = 0
+        self.failures = 0
+
+    def allow_request(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() >= self.opened_until:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+        self.successes += 1
+
+    def record_failure(self, error: Exception):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = str(error)
+        self.trial_in_flight = False
+
+        if is_quota_error(error):
+            self._open(QUOTA_COOLDOWN_SECONDS)
+        elif self.state == "half_open" or self.consecutive_failures >= FAILURE_THRESHOLD:
+            self._open(FAILURE_COOLDOWN_SECONDS)
+
+    def _open(self, cooldown: float):
+        self.state = "open"
+        self.opened_until = time.monotonic() + cooldown
+
+    def snapshot(self) -> dict:
+        retry_in = max(0.0, self.opened_until - time.monotonic()) if self.state == "open" else 0.0
+        return {
+            "model": self.model_name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(retry_in, 1),
+            "successes": self.successes,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class ModelRouter:
+    """
+    Shared async failover across the Gemini model list.
+    Models with an open breaker are skipped immediately, and backoff between
+    failed models uses asyncio.sleep so the event loop keeps serving other requests.
+    Every call also needs a token from the quota governor for its priority class.
+    """
+    def __init__(self, model_names: List[str]):
+        self.model_names = list(model_names)
+        self.breakers: Dict[str, CircuitBreaker] = {name: CircuitBreaker(name) for name in self.model_names}
+        self.governor = QuotaGovernor(self.model_names)
+
+    async def run(self, call: Callable[[str], Awaitable[T]], label: str = "AI",
+                  priority: int = PRIORITY_CHAT) -> T:
+        """
+        Calls `call(model_name)` on each healthy model in priority order until one succeeds.
+        Models whose token bucket is too low for `priority` are retried after waiting for a
+        refill, up to the class's max wait; after that the call is shed.
+        Raises LoadShedError if the governor shed the call, AllModelsFailedError if no model succeeded.
+        """
+        last_error = None
+        quota_error_hit = False
+        attempt = 0
+        deadline = time.monotonic() + self.governor.max_wait(priority)
+        pending = list(self.model_names)
+
+        while pending:
+            throttled = []
+            for model_name in pending:
+                breaker = self.breakers[model_name]
+                if not breaker.allow_request():
+                    print(f"DEBUG: Skipping {model_name} for {label} (circuit {breaker.state})")
+                    if breaker.last_error and is_quota_error(breaker.last_error):
+                        quota_error_hit = True
+                    last_error = last_error or breaker.last_error
+                    continue
+
+                if not self.governor.try_acquire(model_name, priority):
+                    # Not a model failure: give back a half-open trial slot and keep the model for later
+                    breaker.trial_in_flight = False
+                    throttled.append(model_name)
+                    continue
+
+                if attempt > 0 and last_error is not None and not is_quota_error(last_error):
+                    # Transient errors get a short async pause; quota errors move on immediately
+                    await asyncio.sleep(min(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)), BACKOFF_MAX_SECONDS))
+                attempt += 1
+
+                try:
+                    print(f"DEBUG: Trying {label} with model: {model_name}")
+                    result = await call(model_name)
+                except asyncio.CancelledError:
+                    breaker.trial_in_flight = False
+                    raise
+                except Exception as e:
+                    print(f"⚠️ {label} model {model_name} failed: {e}")
+                    breaker.record_failure(e)
+                    last_error = str(e)
+                    if is_quota_error(e):
+                        quota_error_hit = True
+                    continue
+
+                breaker.record_success()
+                return result
+
+            if not throttled:
+                break
+
+            # Queue for the first bucket that refills for this class, unless that misses the deadline
+            model_name, wait = self.governor.soonest(throttled, priority)
+            if time.monotonic() + wait > deadline:
+                for name in throttled:
+                    self.governor.record_shed(name, priority)
+                print(f"⏳ {label} shed by quota governor ({PRIORITY_NAMES[priority]} budget exhausted).")
+                raise LoadShedError()
+
+            self.governor.start_waiting(model_name, priority)
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.governor.stop_waiting(model_name, priority)
+            pending = throttled
+
+        print(f"❌ All AI models failed for {label}.")
+        raise AllModelsFailedError(last_error, quota_error_hit)
+
+    def snapshot(self) -> List[dict]:
+        return [self.breakers[name].snapshot() for name in self.model_names]
+
+    def quota_snapshot(self) -> List[dict]:
+        return self.governor.snapshot()
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, Date
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Enum, Date, DateTime, Index, JSON
 from sqlalchemy.orm import relationship
 import enum
-from datetime import date
+from datetime import date, datetime
 from database import Base
 
 # Enum for Level Status
@@ -22,11 +22,28 @@ class User(Base):
     last_login = Column(Date, nullable=True)
     profile_image = Column(String, nullable=True) # Optional avatar URL
 
+    # /leaderboard sorts by coins, then streak
+    __table_args__ = (Index("ix_users_coins_streak", "coins", "streak"),)
+
     # Relationships
     progress = relationship("UserProgress", back_populates="user")
     owned_items = relationship("UserItem", back_populates="user")
     challenge_completions = relationship("UserChallengeCompletion", back_populates="user")
 
+class CoinLedger(Base):
+    """Append-only record of every coin balance change (see coins.py)"""
+    __tablename__ = "coin_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delta = Column(Integer, nullable=False) # +earned / -spent
+    balance_after = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False) # 'level_progress', 'eco_scan', 'challenge', 'purchase', 'opening_balance'
+    reference = Column(String, nullable=True) # e.g. 'level:3', 'challenge:2', 'item:5'
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index("ix_coin_ledger_user_id", "user_id", "id"),)
+
 class Level(Base):
     __tablename__ = "levels"
 
@@ -34,7 +51,7 @@ class Level(Base):
     title = Column(String)      # e.g., "Green Forest"
     description = Column(String) # e.g., "Learn about segregation"
     info_content = Column(String, default="") # Detailed educational content
-    order = Column(Integer)     # 1, 2, 3...
+    order = Column(Integer, index=True)     # 1, 2, 3... (next level lookup on completion)
     xp_reward = Column(Integer, default=100) # Coins reward
     theme_id = Column(String)   # 'forest', 'river' etc. for frontend map matching
     video_id = Column(String, default="dQw4w9WgXcQ") # YouTube Video ID
@@ -42,7 +59,7 @@ class Level(Base):
 
     # Relationships
     user_progress = relationship("UserProgress", back_populates="level")
-    questions = relationship("Question", back_populates="level")
+    questions = relationship("Question", back_populates="level", order_by="Question.id")
 
 class StoreItem(Base):
     __tablename__ = "store_items"
@@ -64,6 +81,9 @@ class UserItem(Base):
     item_id = Column(Integer, ForeignKey("store_items.id"))
     purchase_date = Column(Date, default=date.today)
 
+    # One row per owned item; also serves the "already owned" check
+    __table_args__ = (Index("ux_user_items_user_item", "user_id", "item_id", unique=True),)
+
     user = relationship("User", back_populates="owned_items")
     item = relationship("StoreItem")
 
@@ -73,14 +93,15 @@ class Question(Base):
     id = Column(Integer, primary_key=True, index=True)
     level_id = Column(Integer, ForeignKey("levels.id"))
     text = Column(String)
-    # Storing options as JSON string or comma-separated for simplicity in SQLite 
-    # (JSON type is available in newer, but simple string with separator is safest for raw prototype)
-    # Actually, we can just use 4 column fields or a delimiter. Let's use a delimiter '|'.
-    options = Column(String) # "A|B|C|D"
+    # List of answer strings, e.g. ["A", "B", "C", "D"] (older databases stored "A|B|C|D"; see migrations.py)
+    options = Column(JSON)
     correct_index = Column(Integer) # 0-3
     difficulty = Column(Integer) # 1-5 (Increasing difficulty)
     segment_index = Column(Integer, default=0) # 0-4 (Which video segment this belongs to)
 
+    # Quiz bundles: one level's questions by segment, easiest first
+    __table_args__ = (Index("ix_questions_level_segment", "level_id", "segment_index", "difficulty", "id"),)
+
     level = relationship("Level", back_populates="questions")
 
 
@@ -93,6 +114,8 @@ class UserProgress(Base):
     status = Column(String, default="locked") # 'locked', 'unlocked', 'completed'
     score = Column(Integer, default=0) # Quiz score (0-5)
 
+    __table_args__ = (Index("ux_user_progress_user_level", "user_id", "level_id", unique=True),)
+
     # Relationships
     user = relationship("User", back_populates="progress")
     level = relationship("Level", back_populates="user_progress")
@@ -117,6 +140,11 @@ class UserChallengeCompletion(Base):
     challenge_id = Column(Integer, ForeignKey("challenges.id"))
     completion_date = Column(Date, default=date.today)
 
+    # Covers the daily (=) and weekly (>=) completion checks; at most one completion per day
+    __table_args__ = (
+        Index("ux_challenge_completions_user_challenge_date", "user_id", "challenge_id", "completion_date", unique=True),
+    )
+
     user = relationship("User", back_populates="challenge_completions")
     challenge = relationship("Challenge")
 
@@ -131,6 +159,13 @@ class CommunityFeed(Base):
     external_link = Column(String)
     created_at = Column(Date, default=date.today)
 
+    # Keyset pagination on (created_at, id), optionally filtered by category or location
+    __table_args__ = (
+        Index("ix_community_feed_created_id", "created_at", "id"),
+        Index("ix_community_feed_category_created_id", "category", "created_at", "id"),
+        Index("ix_community_feed_location_created_id", "location", "created_at", "id"),
+    )
+
 class NGORequest(Base):
     __tablename__ = "ngo_requests"
 
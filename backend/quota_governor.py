@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+
+load_dotenv()
+
+# --- Priority Classes (lower value = more important) ---
+PRIORITY_VERIFICATION = 0  # challenge + level verification (coins depend on it)
+PRIORITY_SCANNER = 1       # eco-scanner
+PRIORITY_CHAT = 2          # EcoBot chat
+
+PRIORITY_NAMES = {PRIORITY_VERIFICATION: "verification", PRIORITY_SCANNER: "scanner", PRIORITY_CHAT: "chat"}
+
+# --- Budget Configuration ---
+# Default per-model budget (requests per minute, bucket size); Gemini free tier is ~15 RPM
+AI_MODEL_RPM = float(os.getenv("AI_MODEL_RPM", 15))
+AI_MODEL_BURST = float(os.getenv("AI_MODEL_BURST", AI_MODEL_RPM))
+# Per-model overrides, e.g. '{"models/gemini-2.5-flash": {"rpm": 10, "burst": 5}}'
+AI_MODEL_BUDGETS = json.loads(os.getenv("AI_MODEL_BUDGETS", "{}"))
+
+# Share of each bucket a class may NOT dip into: chat stops at 40% full, the scanner at 20%,
+# so the remaining tokens are kept for verification traffic
+RESERVE_FRACTION = {
+    PRIORITY_VERIFICATION: 0.0,
+    PRIORITY_SCANNER: float(os.getenv("AI_SCANNER_RESERVE", 0.2)),
+    PRIORITY_CHAT: float(os.getenv("AI_CHAT_RESERVE", 0.4)),
+}
+# How long a class may queue for a token before it is shed
+MAX_WAIT_SECONDS = {
+    PRIORITY_VERIFICATION: float(os.getenv("AI_VERIFY_MAX_WAIT", 8)),
+    PRIORITY_SCANNER: float(os.getenv("AI_SCANNER_MAX_WAIT", 2)),
+    PRIORITY_CHAT: float(os.getenv("AI_CHAT_MAX_WAIT", 0)),
+}
+# Shortest sleep between retries while queued, so waiters never spin
+MIN_WAIT_SECONDS = 0.05
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waiting = {priority: 0 for priority in PRIORITY_NAMES}
+        self.granted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.shed = {priority: 0 for priority in PRIORITY_NAMES}
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def floor_for(self, priority: int) -> float:
+        return self.capacity * RESERVE_FRACTION[priority]
+
+    def seconds_until_available(self, priority: int) -> float:
+        self.refill()
+        # Higher-priority callers already queued here get their tokens first
+        queued_ahead = sum(count for p, count in self.waiting.items() if p < priority)
+        missing = self.floor_for(priority) + 1 + queued_ahead - self.tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float("inf")
+
+
+class QuotaGovernor:
+    """
+    Per-model token buckets shared by all outbound Gemini calls.
+    A call takes a token only if the bucket stays above its class's reserve and no
+    higher-priority caller is queued on that model, so chat is shed before the
+    scanner, and the scanner before verification.
+    """
+    def __init__(self, model_names: List[str]):
+        self.buckets: Dict[str, TokenBucket] = {}
+        for name in model_names:
+            budget = AI_MODEL_BUDGETS.get(name, {})
+            rpm = float(budget.get("rpm", AI_MODEL_RPM))
+            self.buckets[name] = TokenBucket(rpm, float(budget.get("burst", min(AI_MODEL_BURST, rpm) or 1)))
+
+    def max_wait(self, priority: int) -> float:
+        return MAX_WAIT_SECONDS[priority]
+
+    def try_acquire(self, model_name: str, priority: int) -> bool:
+        bucket = self.buckets[model_name]
+        bucket.refill()
+        higher_waiting = any(count for p, count in bucket.waiting.items() if p < priority)
+        if higher_waiting or bucket.tokens - 1 < bucket.floor_for(priority):
+            return False
+        bucket.tokens -= 1
+        bucket.granted[priority] += 1
+        return True
+
+    def record_shed(self, model_name: str, priority: int):
+        self.buckets[model_name].shed[priority] += 1
+
+    def soonest(self, model_names: List[str], priority: int) -> Optional[tuple]:
+        """
+        (model_name, seconds) for the model whose bucket refills for this class first.
+        """
+        if not model_names:
+            return None
+        name, wait = min(((name, self.buckets[name].seconds_until_available(priority)) for name in model_names),
+                         key=lambda item: item[1])
+        return name, max(wait, MIN_WAIT_SECONDS)
+
+    def start_waiting(self, model_name: str, priority: int):
+        self.buckets[model_name].waiting[priority] += 1
+
+    def stop_waiting(self, model_name: str, priority: int):
+        self.buckets[model_name].waiting[priority] -= 1
+
+    def snapshot(self) -> List[dict]:
+        levels = []
+        for name, bucket in self.buckets.items():
+            bucket.refill()
+            levels.append({
+                "model": name,
+                "tokens": round(bucket.tokens, 2),
+                "capacity": bucket.capacity,
+                "fill": round(bucket.tokens / bucket.capacity, 3) if bucket.capacity else 0.0,
+                "rpm": round(bucket.rate * 60, 2),
+                "waiting": {PRIORITY_NAMES[p]: n for p, n in bucket.waiting.items()},
+                "granted": {PRIORITY_NAMES[p]: n for p, n in bucket.granted.items()},
+                "shed": {PRIORITY_NAMES[p]: n for p, n in bucket.shed.items()},
+            })
+        return levels
@@ -0,0 +1,42 @@
+import argparse
+import sys
+
+import coins
+import database
+import models
+
+# Batch check of every user's coin balance against the sum of their ledger entries.
+# Exits 1 when mismatches are found (suitable for cron / CI). With --fix, each mismatch
+# gets a 'reconciliation' ledger entry so the ledger matches the balance again.
+#
+#   python reconcile_coins.py [--batch-size 1000] [--fix]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile coin balances with the coin ledger")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--fix", action="store_true", help="Record an adjusting ledger entry per mismatch")
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        mismatches = list(coins.find_mismatches(db, args.batch_size))
+        for user_id, username, balance, ledger_total in mismatches:
+            print(f"❌ user {user_id} ({username}): balance {balance}, ledger {ledger_total} (off by {balance - ledger_total})")
+            if args.fix:
+                db.add(models.CoinLedger(
+                    user_id=user_id, delta=balance - ledger_total, balance_after=balance, reason="reconciliation",
+                ))
+        if args.fix and mismatches:
+            db.commit()
+            print(f"Recorded {len(mismatches)} reconciliation entries.")
+    finally:
+        db.close()
+
+    if not mismatches:
+        print("✅ All balances match the ledger.")
+    sys.exit(1 if mismatches and not args.fix else 0)
+
+
+if __name__ == "__main__":
+    main()
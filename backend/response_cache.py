@@ -0,0 +1,104 @@
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Hashable, Optional, Union
+from dotenv import load_dotenv
+from fastapi import Request, Response
+import compression
+
+load_dotenv()
+
+# Browsers/CDNs may reuse public catalogs briefly, then revalidate with If-None-Match
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=300")
+
+
+class CachedPayload:
+    def __init__(self, body: bytes, parts: Optional[Dict[Hashable, "CachedPayload"]] = None):
+        self.body = body
+        # Sub-documents compiled alongside the body (e.g. one quiz segment), cached with it
+        self.parts = parts or {}
+        # Strong ETag: a hash of the exact bytes served
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        # encoding -> (compressed body, ETag), compressed once on first request
+        self._encoded: Dict[str, tuple] = {}
+
+    def variant(self, encoding: Optional[str]):
+        """
+        (body, etag) for the given Content-Encoding, or the identity body for None.
+        """
+        if encoding is None:
+            return self.body, self.etag
+        if encoding not in self._encoded:
+            # Each representation needs its own strong ETag
+            self._encoded[encoding] = (compression.compress(self.body, encoding), f'{self.etag[:-1]}-{encoding}"')
+        return self._encoded[encoding]
+
+
+class ResponseCache:
+    """
+    In-process cache of pre-serialized JSON bodies for read-mostly catalogs.
+    Entries are built on first request and kept until `invalidate()` bumps the
+    version (called by the endpoints that rewrite the underlying rows).
+    Each worker process keeps its own copy.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.version = 0
+        self._entries: Dict[str, CachedPayload] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: str, build: Callable[[], Union[bytes, CachedPayload]]) -> CachedPayload:
+        with self._lock:
+            payload = self._entries.get(key)
+            version = self.version
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        self.misses += 1
+        built = build()
+        payload = built if isinstance(built, CachedPayload) else CachedPayload(built)
+        with self._lock:
+            # Don't store a body built from rows that were replaced while we were reading them
+            if self.version == version:
+                self._entries[key] = payload
+        return payload
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+        print(f"DEBUG: {self.name} cache invalidated (version {self.version})")
+
+    def stats(self) -> dict:
+        return {"version": self.version, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def cached_json_response(request: Request, payload: CachedPayload, cache_control: Optional[str] = "no-cache") -> Response:
+    """
+    The cached body as application/json (pre-compressed when the client accepts it),
+    or an empty 304 when the client already has it.
+    """
+    encoding = compression.choose_encoding(request.headers.get("accept-encoding", ""), len(payload.body))
+    body, etag = payload.variant(encoding)
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -40,10 +40,9 @@ class LevelBase(BaseModel):
 
 class QuestionBase(BaseModel):
     text: str
-    options: str
+    options: List[str]
     correct_index: int
     difficulty: int
-    difficulty: int
     segment_index: int = 0
 
 class Question(QuestionBase):
@@ -59,6 +58,14 @@ class Level(LevelBase):
     class Config:
         from_attributes = True
 
+class QuizSegment(BaseModel):
+    segment_index: int
+    questions: List[Question] # Easiest first
+
+class QuizBundle(BaseModel):
+    level_id: int
+    segments: List[QuizSegment] # By segment_index; only segments that have questions
+
 class UserProgressBase(BaseModel):
     level_id: int
     status: str
@@ -151,6 +158,10 @@ class CommunityFeedSchema(BaseModel):
     class Config:
         from_attributes = True
 
+class CommunityFeedPage(BaseModel):
+    items: List[CommunityFeedSchema]
+    next_cursor: Optional[str] = None # Pass back as ?cursor= for the next page; None on the last page
+
 class NGORequestCreate(BaseModel):
     org_name: str
     email: str
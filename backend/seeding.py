@@ -0,0 +1,112 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+import models
+
+# Diff-based bulk upserts for the demo seed endpoints (/seed, /seed-full).
+# Each table is read once, compared with the seed rows in Python, and only the
+# differences are written: one bulk INSERT, one bulk UPDATE (by primary key) and
+# one DELETE per table. Nothing is committed here; the caller commits once, so a
+# failure leaves the database exactly as it was.
+
+
+def empty_counts() -> Dict[str, int]:
+    return {"inserted": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+
+def sync_table(
+    db: Session,
+    model,
+    key: Sequence[str],
+    rows: List[dict],
+    insert_only: Iterable[str] = (),
+    remove_missing: bool = False,
+    where=None,
+) -> Dict[str, int]:
+    """
+    Makes the rows of `model` (optionally only those matching `where`) match `rows`,
+    identified by the `key` columns.
+    `insert_only` columns are written for new rows but never updated (e.g. dates).
+    With `remove_missing`, existing rows whose key isn't in `rows` are deleted.
+    """
+    counts = empty_counts()
+    table = model.__table__
+    columns = list(dict.fromkeys([*key, *(name for row in rows for name in row)]))
+    compared = [name for name in columns if name not in key and name not in set(insert_only)]
+
+    query = select(table.c.id, *(table.c[name] for name in columns))
+    if where is not None:
+        query = query.where(where)
+    existing = {}
+    stale_ids = []
+    for row in db.execute(query).mappings():
+        row_key = tuple(row[name] for name in key)
+        if row_key in existing:
+            # Duplicate key from before the data was managed here
+            stale_ids.append(row["id"])
+        else:
+            existing[row_key] = row
+
+    inserts, updates, seen = [], [], set()
+    for row in rows:
+        row_key = tuple(row[name] for name in key)
+        if row_key in seen:
+            continue
+        seen.add(row_key)
+        current = existing.get(row_key)
+        if current is None:
+            inserts.append(row)
+        elif any(current[name] != row.get(name) for name in compared):
+            updates.append({"id": current["id"], **{name: row.get(name) for name in compared}})
+        else:
+            counts["unchanged"] += 1
+
+    if remove_missing:
+        stale_ids += [row["id"] for row_key, row in existing.items() if row_key not in seen]
+    else:
+        stale_ids = []
+
+    if inserts:
+        db.execute(insert(model), inserts)
+    if updates:
+        db.execute(update(model), updates)
+    if stale_ids:
+        db.execute(delete(model).where(model.id.in_(stale_ids)))
+
+    counts["inserted"], counts["updated"], counts["removed"] = len(inserts), len(updates), len(stale_ids)
+    return counts
+
+
+def seed_levels(db: Session, levels: List[dict], questions_by_order: Dict[int, List[dict]]) -> Dict[str, dict]:
+    """
+    Upserts levels by `order`, then replaces the question set of every level that has
+    seed questions (matched by text, so unchanged questions keep their ids).
+    """
+    counts = {"levels": sync_table(db, models.Level, ("order",), levels)}
+
+    orders = [order for order, questions in questions_by_order.items() if questions]
+    level_ids: Dict[int, int] = dict(
+        db.execute(select(models.Level.order, models.Level.id).where(models.Level.order.in_(orders))).all()
+    )
+    question_rows = [
+        {"level_id": level_ids[order], **question}
+        for order in orders if order in level_ids
+        for question in questions_by_order[order]
+    ]
+    counts["questions"] = sync_table(
+        db, models.Question, ("level_id", "text"), question_rows,
+        remove_missing=True, where=models.Question.level_id.in_(list(level_ids.values())),
+    )
+    return counts
+
+
+def changed(counts: Optional[Dict[str, int]]) -> bool:
+    return bool(counts) and any(counts[name] for name in ("inserted", "updated", "removed"))
+
+
+def summary(counts: Dict[str, Dict[str, int]]) -> str:
+    return " / ".join(
+        f"{name.replace('_', ' ').title()}: {c['inserted']} inserted, {c['updated']} updated, "
+        f"{c['removed']} removed, {c['unchanged']} unchanged"
+        for name, c in counts.items()
+    )
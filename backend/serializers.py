@@ -0,0 +1,102 @@
+from collections import defaultdict
+from typing import List, Optional, Sequence
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+import models
+
+# Hot list endpoints serialize straight from row tuples: one column SELECT per
+# table, plain dicts, orjson. This skips building ORM objects (identity map,
+# attribute instrumentation) and then Pydantic models from them, which dominated
+# the cost of the catalog endpoints. Keys and their order match the response
+# models in schemas.py, so the JSON is unchanged for clients.
+
+LEVEL_COLUMNS = (
+    models.Level.title, models.Level.description, models.Level.order, models.Level.xp_reward,
+    models.Level.theme_id, models.Level.video_id, models.Level.task_description,
+    models.Level.info_content, models.Level.id,
+)
+QUESTION_COLUMNS = (
+    models.Question.text, models.Question.options, models.Question.correct_index,
+    models.Question.difficulty, models.Question.segment_index, models.Question.id,
+)
+STORE_ITEM_COLUMNS = (
+    models.StoreItem.id, models.StoreItem.name, models.StoreItem.description, models.StoreItem.price,
+    models.StoreItem.icon_type, models.StoreItem.category, models.StoreItem.image_url,
+)
+FEED_COLUMNS = (
+    models.CommunityFeed.id, models.CommunityFeed.title, models.CommunityFeed.category,
+    models.CommunityFeed.location, models.CommunityFeed.description,
+    models.CommunityFeed.external_link, models.CommunityFeed.created_at,
+)
+
+
+def _keys(columns) -> List[str]:
+    return [column.key for column in columns]
+
+
+def rows_to_dicts(rows: Sequence[tuple], columns) -> List[dict]:
+    keys = _keys(columns)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def dumps(data) -> bytes:
+    # orjson encodes dates as ISO strings, like Pydantic
+    return orjson.dumps(data)
+
+
+def levels(db: Session) -> List[dict]:
+    """
+    Every level with its questions (schemas.Level), in two queries.
+    """
+    question_keys = _keys(QUESTION_COLUMNS)
+    questions = defaultdict(list)
+    for level_id, *row in db.execute(
+        select(models.Question.level_id, *QUESTION_COLUMNS).order_by(models.Question.id)
+    ):
+        questions[level_id].append(dict(zip(question_keys, row)))
+
+    level_keys = _keys(LEVEL_COLUMNS)
+    result = []
+    for row in db.execute(select(*LEVEL_COLUMNS).order_by(models.Level.id)):
+        level = dict(zip(level_keys, row))
+        level["questions"] = questions.get(level["id"], [])
+        result.append(level)
+    return result
+
+
+def quiz_bundle(db: Session, level_id: int) -> Optional[dict]:
+    """
+    One level's questions grouped by video segment, easiest first (schemas.QuizBundle),
+    or None if the level doesn't exist.
+    """
+    if db.execute(select(models.Level.id).where(models.Level.id == level_id)).first() is None:
+        return None
+    question_keys = _keys(QUESTION_COLUMNS)
+    segments = {}
+    for row in db.execute(
+        select(*QUESTION_COLUMNS)
+        .where(models.Question.level_id == level_id)
+        .order_by(models.Question.segment_index, models.Question.difficulty, models.Question.id)
+    ):
+        question = dict(zip(question_keys, row))
+        index = question["segment_index"]
+        segments.setdefault(index, {"segment_index": index, "questions": []})["questions"].append(question)
+    return {"level_id": level_id, "segments": list(segments.values())}
+
+
+def store_items(db: Session) -> List[dict]:
+    rows = db.execute(select(*STORE_ITEM_COLUMNS).order_by(models.StoreItem.id)).all()
+    return rows_to_dicts(rows, STORE_ITEM_COLUMNS)
+
+
+def feed_select(category: Optional[str] = None, location: Optional[str] = None):
+    """
+    Newest-first community feed columns (schemas.CommunityFeedSchema), optionally filtered.
+    """
+    query = select(*FEED_COLUMNS)
+    if category:
+        query = query.where(models.CommunityFeed.category == category)
+    if location:
+        query = query.where(models.CommunityFeed.location == location)
+    return query.order_by(models.CommunityFeed.created_at.desc(), models.CommunityFeed.id.desc())
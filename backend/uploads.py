@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import os
+import threading
+import uuid
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.formparsers import MultiPartParser
+from typing import Optional
+
+load_dotenv()
+
+# --- Upload Configuration ---
+# Hard cap for any single upload (videos included)
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 50 * 1024 * 1024))
+# Images are kept in memory and never touch disk; they get a tighter cap
+UPLOAD_MAX_IMAGE_BYTES = int(os.getenv("UPLOAD_MAX_IMAGE_BYTES", 15 * 1024 * 1024))
+# Starlette buffers each multipart file part before the route runs and, by default,
+# spills parts over 1 MB to an (unnamed) temp file, so a typical phone photo would hit
+# disk before spool_upload ever saw it. Parts up to this size stay in memory instead.
+# Videos above it are still written twice: Starlette's temp file, then the copy in
+# UPLOAD_SPOOL_DIR (frame extraction and the Gemini File API need a named path, and
+# Starlette's temp file has none).
+UPLOAD_MEMORY_PART_BYTES = int(os.getenv("UPLOAD_MEMORY_PART_BYTES", UPLOAD_MAX_IMAGE_BYTES))
+MultiPartParser.spool_max_size = UPLOAD_MEMORY_PART_BYTES
+# Where large (video) uploads spill, and the total bytes that area may hold at once
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR", "temp_uploads")
+UPLOAD_SPOOL_MAX_BYTES = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", 500 * 1024 * 1024))
+CHUNK_SIZE = 1024 * 1024
+# Room for the multipart envelope and small form fields on top of the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Upload too large (max {limit // (1024 * 1024)} MB)")
+
+
+class SpoolBudget:
+    """
+    Tracks bytes currently spilled to the spool directory across all requests.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, nbytes: int) -> bool:
+        with self._lock:
+            if self.used + nbytes > self.max_bytes:
+                return False
+            self.used += nbytes
+            return True
+
+    def release(self, nbytes: int):
+        with self._lock:
+            self.used = max(0, self.used - nbytes)
+
+
+spool_budget = SpoolBudget(UPLOAD_SPOOL_MAX_BYTES)
+
+
+class SpooledUpload:
+    """
+    A fully received upload: in memory (`data`) for images, on disk (`path`) for videos.
+    `digest` is the SHA-256 of the bytes, computed while streaming.
+    """
+    def __init__(self, filename: str, content_type: str, size: int, digest: str,
+                 data: Optional[bytes] = None, path: Optional[str] = None):
+        self.filename = filename
+        self.content_type = content_type or "application/octet-stream"
+        self.size = size
+        self.digest = digest
+        self.data = data
+        self.path = path
+        # Shared work (e.g. a coalesced model call) holds the upload so cleanup waits for it
+        self._holds = 0
+        self._cleanup_pending = False
+
+    @property
+    def is_video(self) -> bool:
+        return self.content_type.startswith("video/")
+
+    @property
+    def source(self):
+        """
+        The bytes if held in memory, otherwise the spool file path (both accepted by PIL).
+        """
+        return self.data if self.data is not None else self.path
+
+    @classmethod
+    def from_bytes(cls, data: bytes, content_type: str, filename: str = "upload") -> "SpooledUpload":
+        return cls(filename, content_type, len(data), hashlib.sha256(data).hexdigest(), data=data)
+
+    def hold(self):
+        """
+        Keeps the data/file alive until the matching release(), even if cleanup() is called meanwhile.
+        """
+        self._holds += 1
+
+    def release(self):
+        self._holds -= 1
+        if self._holds == 0 and self._cleanup_pending:
+            self.cleanup()
+
+    def cleanup(self):
+        if self._holds:
+            self._cleanup_pending = True
+            return
+        self._cleanup_pending = False
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+            spool_budget.release(self.size)
+        self.path = None
+        self.data = None
+
+
+async def spool_upload(file: UploadFile) -> SpooledUpload:
+    """
+    Streams an UploadFile in chunks, hashing as it goes and enforcing size limits.
+    Images stay in memory (Starlette kept them in memory too, see UPLOAD_MEMORY_PART_BYTES);
+    everything else is copied to the bounded spool directory.
+    Raises 413 as soon as a limit is crossed and 503 if the spool area is full.
+    """
+    content_type = file.content_type or "application/octet-stream"
+    in_memory = content_type.startswith("image/")
+    limit = UPLOAD_MAX_IMAGE_BYTES if in_memory else UPLOAD_MAX_BYTES
+
+    digest = hashlib.sha256()
+    size = 0
+    spooled = 0
+    buffer = bytearray()
+    path = None
+    handle = None
+
+    try:
+        while True:
+            chunk = await file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > limit:
+                raise _too_large(limit)
+            digest.update(chunk)
+
+            if in_memory:
+                buffer.extend(chunk)
+                continue
+
+            if not spool_budget.reserve(len(chunk)):
+                raise HTTPException(status_code=503, detail="Server is busy processing uploads. Please retry shortly.")
+            spooled += len(chunk)
+            if handle is None:
+                os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+                _, ext = os.path.splitext(file.filename or "")
+                path = os.path.join(UPLOAD_SPOOL_DIR, f"{os.getpid()}_{uuid.uuid4().hex}{ext[:10]}")
+                handle = open(path, "wb")
+            await asyncio.to_thread(handle.write, chunk)
+    except BaseException:
+        if handle is not None:
+            handle.close()
+            os.remove(path)
+        spool_budget.release(spooled)
+        raise
+    finally:
+        await file.close()
+
+    if handle is not None:
+        handle.close()
+
+    return SpooledUpload(
+        filename=file.filename or "upload",
+        content_type=content_type,
+        size=size,
+        digest=digest.hexdigest(),
+        data=bytes(buffer) if in_memory else None,
+        path=path,
+    )
+
+
+def sweep_spool_dir() -> int:
+    """
+    Removes spool files left behind by workers that are no longer running.
+    Files are named '<pid>_<uuid>', so live workers' files are kept.
+    """
+    if not os.path.isdir(UPLOAD_SPOOL_DIR):
+        return 0
+
+    removed = 0
+    for name in os.listdir(UPLOAD_SPOOL_DIR):
+        path = os.path.join(UPLOAD_SPOOL_DIR, name)
+        if not os.path.isfile(path):
+            continue
+        owner_pid = name.split("_", 1)[0]
+        if owner_pid.isdigit() and int(owner_pid) != os.getpid() and _pid_alive(int(owner_pid)):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+
+    if removed:
+        print(f"🧹 Swept {removed} leftover upload(s) from {UPLOAD_SPOOL_DIR}")
+    return removed
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects oversized multipart requests with 413 before the body is parsed:
+    immediately from Content-Length when present, otherwise as soon as the
+    streamed body crosses the limit.
+    """
+    def __init__(self, app, max_bytes: int = UPLOAD_MAX_BYTES + FORM_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": _too_large(UPLOAD_MAX_BYTES).detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large(UPLOAD_MAX_BYTES)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from dotenv import load_dotenv
+from typing import Optional
+
+load_dotenv()
+
+# --- Cache Configuration ---
+# Max verdicts kept in the in-memory LRU tier
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", 512))
+# Optional SQLite file for the persistent tier (empty = memory only)
+VERIFY_CACHE_DB = os.getenv("VERIFY_CACHE_DB", "")
+# How long a verdict stays valid in either tier
+VERIFY_CACHE_TTL_SECONDS = int(os.getenv("VERIFY_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+
+def make_key(content_digest: str, task_label: str) -> str:
+    """
+    Content-addressed key: the same bytes verified against the same task label.
+    """
+    label = " ".join((task_label or "").lower().split())
+    return hashlib.sha256(f"{content_digest}:{label}".encode("utf-8")).hexdigest()
+
+
+class VerificationCache:
+    """
+    Two-tier verdict cache: a bounded in-memory LRU in front of an optional
+    SQLite table. Entries in both tiers expire after the TTL.
+    """
+    def __init__(self, max_entries: int = VERIFY_CACHE_SIZE, db_path: str = VERIFY_CACHE_DB,
+                 ttl_seconds: int = VERIFY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS verification_cache ("
+                    " cache_key TEXT PRIMARY KEY,"
+                    " result TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    # --- Memory Tier ---
+
+    def _memory_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            result, expires_at = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return result
+
+    def _memory_set(self, key: str, result: dict, expires_at: float):
+        with self._lock:
+            self._memory[key] = (result, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # --- SQLite Tier ---
+
+    def _db_get(self, key: str) -> Optional[tuple]:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT result, expires_at FROM verification_cache WHERE cache_key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _db_set(self, key: str, result: dict, expires_at: float):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO verification_cache (cache_key, result, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), expires_at),
+            )
+            # Opportunistic sweep so the table doesn't grow without bound
+            conn.execute("DELETE FROM verification_cache WHERE expires_at <= ?", (time.time(),))
+
+    # --- Public API ---
+
+    async def get(self, key: str) -> Optional[dict]:
+        result = self._memory_get(key)
+        if result is None and self.db_path:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None:
+                result, expires_at = row
+                self._memory_set(key, result, expires_at)
+
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return dict(result)
+
+    async def set(self, key: str, result: dict):
+        expires_at = time.time() + self.ttl_seconds
+        self._memory_set(key, dict(result), expires_at)
+        if self.db_path:
+            await asyncio.to_thread(self._db_set, key, dict(result), expires_at)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "persistent": bool(self.db_path),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from typing import Awaitable, Callable, Dict, Optional
+
+load_dotenv()
+
+# --- Job Queue Configuration ---
+# Verifications running concurrently (each one holds an outbound Gemini call)
+VERIFY_JOB_WORKERS = int(os.getenv("VERIFY_JOB_WORKERS", 4))
+# Jobs allowed to wait for a worker before submissions get 503
+VERIFY_JOB_QUEUE_SIZE = int(os.getenv("VERIFY_JOB_QUEUE_SIZE", 100))
+# How long finished jobs stay available for polling
+VERIFY_JOB_TTL_SECONDS = int(os.getenv("VERIFY_JOB_TTL_SECONDS", 15 * 60))
+
+
+class VerificationJob:
+    def __init__(self, user_id: int, kind: str, run: Callable[[], Awaitable[dict]],
+                 on_discard: Optional[Callable[[], None]] = None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = "queued"
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.status_code = 202
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.run = run
+        self.on_discard = on_discard
+        self.changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def _set_status(self, status: str):
+        self.status = status
+        # Wake everyone waiting on this job, then re-arm for the next change
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "status_code": self.status_code,
+        }
+
+
+class JobQueue:
+    """
+    Bounded asyncio queue drained by a fixed pool of workers.
+    Submissions return immediately with a job id; results are polled or streamed.
+    Job state lives only in this process's memory: /jobs/{id} returns 404 on any
+    other worker, so run a single uvicorn worker (or pin clients to one with
+    sticky sessions) while jobs are in use.
+    """
+    def __init__(self, workers: int = VERIFY_JOB_WORKERS, max_pending: int = VERIFY_JOB_QUEUE_SIZE):
+        self.worker_count = workers
+        self.max_pending = max_pending
+        self.jobs: Dict[str, VerificationJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        # Release resources (spooled uploads) held by jobs that never ran
+        for job in self.jobs.values():
+            if job.status == "queued" and job.on_discard:
+                job.on_discard()
+
+    def submit(self, user_id: int, kind: str, run: Callable[[], Awaitable[dict]],
+               on_discard: Optional[Callable[[], None]] = None) -> VerificationJob:
+        self._purge_expired()
+        job = VerificationJob(user_id, kind, run, on_discard)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            if on_discard:
+                on_discard()
+            raise HTTPException(status_code=503, detail="Verification queue is full. Please retry shortly.")
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str, user_id: int) -> VerificationJob:
+        job = self.jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    async def wait_for_change(self, job: VerificationJob, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(job.changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job._set_status("running")
+            try:
+                job.result = await job.run()
+                job.status_code = 200
+                job._set_status("completed")
+            except HTTPException as e:
+                job.error = e.detail
+                job.status_code = e.status_code
+                job._set_status("failed")
+            except Exception as e:
+                print(f"⚠️ Verification job {job.id} crashed: {e}")
+                job.error = "Verification failed unexpectedly. Please try again."
+                job.status_code = 500
+                job._set_status("failed")
+            finally:
+                job.finished_at = time.time()
+                job.run = None
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        cutoff = time.time() - VERIFY_JOB_TTL_SECONDS
+        expired = [job_id for job_id, job in self.jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.worker_count,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "tracked_jobs": len(self.jobs),
+        }
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import shutil
+from dotenv import load_dotenv
+from typing import List, Optional
+
+load_dotenv()
+
+# --- Video Verification Configuration ---
+# 'keyframes' samples frames locally with ffmpeg; 'upload' sends the whole file via the Gemini File API
+VIDEO_VERIFY_MODE = os.getenv("VIDEO_VERIFY_MODE", "keyframes")
+VIDEO_KEYFRAME_COUNT = int(os.getenv("VIDEO_KEYFRAME_COUNT", 6))
+VIDEO_KEYFRAME_MAX_EDGE = int(os.getenv("VIDEO_KEYFRAME_MAX_EDGE", 768))
+FFMPEG_TIMEOUT_SECONDS = float(os.getenv("FFMPEG_TIMEOUT_SECONDS", 20))
+
+FFMPEG = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+
+def keyframes_available() -> bool:
+    return VIDEO_VERIFY_MODE == "keyframes" and FFMPEG is not None and FFPROBE is not None
+
+
+async def _run(*args: str) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=FFMPEG_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise Exception(f"{os.path.basename(args[0])} timed out")
+    if process.returncode != 0:
+        raise Exception(f"{os.path.basename(args[0])} failed: {stderr.decode(errors='ignore')[-200:]}")
+    return stdout
+
+
+async def probe_duration(video_path: str) -> float:
+    output = await _run(
+        FFPROBE, "-v", "error", "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1", video_path,
+    )
+    return float(output.strip() or 0)
+
+
+async def _grab_frame(video_path: str, timestamp: float) -> bytes:
+    # -ss before -i seeks on keyframes (fast); frames come out as JPEG on stdout, never on disk
+    scale = f"scale={VIDEO_KEYFRAME_MAX_EDGE}:{VIDEO_KEYFRAME_MAX_EDGE}:force_original_aspect_ratio=decrease"
+    return await _run(
+        FFMPEG, "-v", "error", "-ss", f"{timestamp:.2f}", "-i", video_path,
+        "-frames:v", "1", "-vf", scale, "-q:v", "4",
+        "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1",
+    )
+
+
+async def extract_keyframes(video_path: str, count: int = VIDEO_KEYFRAME_COUNT) -> Optional[List[dict]]:
+    """
+    Samples `count` evenly spaced frames from the video as inline JPEG parts.
+    Returns None when ffmpeg is unavailable or extraction fails, so callers can
+    fall back to a full-file upload.
+    """
+    if not keyframes_available():
+        return None
+
+    try:
+        duration = await probe_duration(video_path)
+        if duration <= 0:
+            raise Exception("Could not determine video duration")
+
+        # Sample the middle of each of `count` equal slices, skipping the very first/last frame
+        timestamps = [duration * (i + 0.5) / count for i in range(count)]
+        frames = await asyncio.gather(*[_grab_frame(video_path, t) for t in timestamps])
+    except Exception as e:
+        print(f"⚠️ Keyframe extraction failed, falling back to upload: {e}")
+        return None
+
+    frames = [frame for frame in frames if frame]
+    if not frames:
+        return None
+
+    total_kb = sum(len(frame) for frame in frames) / 1024
+    print(f"DEBUG: Extracted {len(frames)} keyframes ({total_kb:.0f}KB) from {duration:.1f}s video")
+    return [{"mime_type": "image/jpeg", "data": frame} for frame in frames]
@@ -98,16 +98,35 @@ const ChatBot = () => {
         setInput('');
         setLoading(true);
 
+        let streamStarted = false;
         try {
-            const { data } = await gameAPI.chat(userMsg);
-            const botResponse = data.response;
-            setMessages(prev => [...prev, { role: 'bot', text: botResponse }]);
+            // Stream tokens into a bot bubble as they arrive
+            const botResponse = await gameAPI.chatStream(userMsg, (delta, fullText) => {
+                if (!streamStarted) {
+                    streamStarted = true;
+                    setLoading(false);
+                    setMessages(prev => [...prev, { role: 'bot', text: fullText }]);
+                } else {
+                    setMessages(prev => [...prev.slice(0, -1), { role: 'bot', text: fullText }]);
+                }
+            });
 
             // Speak the response
             speak(botResponse);
 
         } catch (error) {
-            setMessages(prev => [...prev, { role: 'bot', text: "Sorry, I'm having trouble connecting. Try again!" }]);
+            if (streamStarted) {
+                setMessages(prev => [...prev, { role: 'bot', text: "Sorry, I lost my connection mid-sentence. Try again!" }]);
+                return;
+            }
+            // Fall back to the non-streaming endpoint
+            try {
+                const { data } = await gameAPI.chat(userMsg);
+                setMessages(prev => [...prev, { role: 'bot', text: data.response }]);
+                speak(data.response);
+            } catch (fallbackError) {
+                setMessages(prev => [...prev, { role: 'bot', text: "Sorry, I'm having trouble connecting. Try again!" }]);
+            }
         } finally {
             setLoading(false);
         }
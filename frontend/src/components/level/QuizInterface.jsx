@@ -10,11 +10,11 @@ const QuizInterface = ({ onPass, onCorrectAnswer, questions = [] }) => {
 
   // Fallback if no questions
   const activeQuestions = questions.length > 0 ? questions : [
-    { text: "No questions loaded from backend.", options: "Error", correct_index: 0, difficulty: 1 }
+    { text: "No questions loaded from backend.", options: ["Error"], correct_index: 0, difficulty: 1 }
   ];
 
   const currentQuestionData = activeQuestions[currentQ];
-  const optionsArray = currentQuestionData.options.split('|');
+  const optionsArray = currentQuestionData.options;
 
   const handleSelect = (index) => {
     setSelected(index);
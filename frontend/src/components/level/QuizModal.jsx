@@ -7,8 +7,7 @@ const QuizModal = ({ question, onCorrect, onIncorrect }) => {
 
     if (!question) return null;
 
-    // Parse options if they are string "A|B|C|D"
-    const options = question.options.split('|');
+    const options = question.options;
 
     const handleOptionSelect = (index) => {
         if (isSubmitted) return;
@@ -4,15 +4,26 @@ import { Calendar, MapPin, ExternalLink } from 'lucide-react';
 import Header from '../components/common/Header';
 
 
+const FEED_PAGE_SIZE = 20;
+
 const Community = () => {
     const [feed, setFeed] = useState([]);
     const [loading, setLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    const fetchPage = async (cursor) => {
+        const params = { limit: FEED_PAGE_SIZE };
+        if (cursor) params.cursor = cursor;
+        const res = await axios.get(`${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/community-feed/page`, { params });
+        setFeed((prev) => (cursor ? [...prev, ...res.data.items] : res.data.items));
+        setNextCursor(res.data.next_cursor);
+    };
 
     useEffect(() => {
         const fetchFeed = async () => {
             try {
-                const res = await axios.get(`${import.meta.env.VITE_API_URL || 'http://localhost:8000'}/community-feed`);
-                setFeed(res.data);
+                await fetchPage(null);
             } catch (err) {
                 console.error("Failed to fetch community feed", err);
             } finally {
@@ -22,6 +33,17 @@ const Community = () => {
         fetchFeed();
     }, []);
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            await fetchPage(nextCursor);
+        } catch (err) {
+            console.error("Failed to fetch more community posts", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     return (
         <div className="min-h-screen bg-slate-50 pb-20 flex flex-col">
             <Header />
@@ -67,6 +89,15 @@ const Community = () => {
                                 </div>
                             </div>
                         ))}
+                        {nextCursor && (
+                            <button
+                                onClick={loadMore}
+                                disabled={loadingMore}
+                                className="mx-auto px-6 py-2 rounded-full bg-green-600 text-white font-bold hover:bg-green-700 disabled:opacity-50 transition"
+                            >
+                                {loadingMore ? 'Loading...' : 'Load more'}
+                            </button>
+                        )}
                     </div>
                 )}
             </main>
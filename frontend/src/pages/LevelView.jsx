@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { useGame } from '../context/GameContext';
+import { gameAPI } from '../services/api';
 import Header from '../components/common/Header';
 import VideoPlayer from '../components/level/VideoPlayer';
 import QuizInterface from '../components/level/QuizInterface';
@@ -27,6 +28,7 @@ const LevelView = () => {
     const [currentSegment, setCurrentSegment] = useState(0); // 0-4
     const [showQuizModal, setShowQuizModal] = useState(false);
     const [isRestartingSegment, setIsRestartingSegment] = useState(false);
+    const [segmentQuestion, setSegmentQuestion] = useState(null); // Fetched per segment from the quiz bundle
 
     useEffect(() => {
         if (levels.length > 0) {
@@ -45,8 +47,17 @@ const LevelView = () => {
         }
     }, [isRestartingSegment]);
 
-    const handleSegmentComplete = () => {
+    const handleSegmentComplete = async () => {
         console.log("Segment Ended. Showing Quiz.");
+        // Only this segment's questions (easiest first); falls back to levelData.questions below
+        try {
+            const response = await gameAPI.getQuizSegment(levelData.id, currentSegment);
+            setSegmentQuestion(response.data.questions[0] || null);
+        } catch (error) {
+            // 404 when this segment has no questions of its own
+            console.error("Failed to load segment quiz", error);
+            setSegmentQuestion(null);
+        }
         setShowQuizModal(true);
     };
 
@@ -106,13 +117,14 @@ const LevelView = () => {
     // Find question for current segment
     // Assuming levelData.questions has 'segment_index' field.
     // Fallback logic if segment_index missing: use array index.
-    const currentQuizQuestion = levelData.questions?.find(q => q.segment_index === currentSegment)
+    const currentQuizQuestion = (segmentQuestion?.segment_index === currentSegment && segmentQuestion)
+        || levelData.questions?.find(q => q.segment_index === currentSegment)
         || levelData.questions?.[currentSegment];
 
     // Fallback if no question found (prevent crash)
     const safeQuestion = currentQuizQuestion || {
         text: "Keep watching closely!",
-        options: "OK|Got it|Understood|Cool",
+        options: ["OK", "Got it", "Understood", "Cool"],
         correct_index: 0
     };
 
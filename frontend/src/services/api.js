@@ -27,12 +27,53 @@ export const authAPI = {
 
 export const gameAPI = {
     getLevels: () => api.get('/levels'),
+    // Per-level quiz: all segments, or just one (questions easiest first)
+    getQuizBundle: (levelId) => api.get(`/levels/${levelId}/quiz`),
+    getQuizSegment: (levelId, segmentIndex) => api.get(`/levels/${levelId}/quiz/${segmentIndex}`),
     updateProgress: (levelId, coinsEarned, xpEarned) =>
         api.post('/users/progress', { level_id: levelId, coins_earned: coinsEarned, xp_earned: xpEarned }),
 
     // Uses the newly added chat endpoint in main.py
     chat: (message) => api.post('/chat', { message }),
 
+    // Streaming chat (SSE over fetch): calls onDelta with each text chunk as it arrives
+    chatStream: async (message, onDelta) => {
+        const response = await fetch(`${API_URL}/chat/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ message }),
+        });
+        if (!response.ok || !response.body) {
+            throw new Error(`Chat stream failed: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let fullText = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by a blank line
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const event of events) {
+                const lines = event.split('\n');
+                const eventType = (lines.find(l => l.startsWith('event: ')) || 'event: message').slice(7);
+                const dataLine = lines.find(l => l.startsWith('data: '));
+                if (eventType === 'error') throw new Error('Chat stream interrupted');
+                if (eventType === 'done' || !dataLine) continue;
+                const { delta } = JSON.parse(dataLine.slice(6));
+                fullText += delta;
+                onDelta(delta, fullText);
+            }
+        }
+        return fullText;
+    },
+
     // The Critical AI Endpoint
     verifyTask: (formData) => api.post('/verify-task', formData, {
         headers: { 'Content-Type': 'multipart/form-data' }
@@ -57,10 +98,24 @@ export const gameAPI = {
         });
     },
 
+    // Job-based verification: submit returns { job_id } right away, then poll getJob
+    submitVerifyTaskJob: (formData) => api.post('/verify-task/jobs', formData, {
+        headers: { 'Content-Type': 'multipart/form-data' }
+    }),
+    submitChallengeJob: (challengeId, file) => {
+        const formData = new FormData();
+        formData.append('file', file);
+        return api.post(`/challenges/${challengeId}/complete/jobs`, formData, {
+            headers: { 'Content-Type': 'multipart/form-data' }
+        });
+    },
+    getJob: (jobId) => api.get(`/jobs/${jobId}`),
+
     getStoreItems: () => api.get('/store/items'),
     buyStoreItem: (itemId) => api.post('/store/buy', { item_id: itemId }),
 
-    getLeaderboard: () => api.get('/leaderboard'),
+    getLeaderboard: (offset = 0, limit = 10) => api.get('/leaderboard', { params: { offset, limit } }),
+    getMyRank: () => api.get('/leaderboard/me'),
 };
 
 export default api;
\ No newline at end of file
@@ -12,6 +12,11 @@ if not os.path.exists(db_path):
 def get_connection():
     return sqlite3.connect(db_path)
 
+def table_exists(cursor, name):
+    # coin_ledger only exists once the API has started against this database
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    return cursor.fetchone() is not None
+
 def list_users():
     conn = get_connection()
     cursor = conn.cursor()
@@ -51,6 +56,8 @@ def delete_user(user_id):
             cursor.execute("DELETE FROM user_progress WHERE user_id = ?", (user_id,))
             cursor.execute("DELETE FROM user_challenge_completions WHERE user_id = ?", (user_id,))
             cursor.execute("DELETE FROM user_items WHERE user_id = ?", (user_id,))
+            if table_exists(cursor, "coin_ledger"):
+                cursor.execute("DELETE FROM coin_ledger WHERE user_id = ?", (user_id,))
             
             # Delete user
             cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
@@ -74,6 +81,8 @@ def delete_all_users():
             cursor.execute("DELETE FROM user_progress")
             cursor.execute("DELETE FROM user_challenge_completions")
             cursor.execute("DELETE FROM user_items")
+            if table_exists(cursor, "coin_ledger"):
+                cursor.execute("DELETE FROM coin_ledger")
             cursor.execute("DELETE FROM users")
             
             conn.commit()
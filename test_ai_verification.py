@@ -1,8 +1,13 @@
 
 import asyncio
 import os
+import sys
 from dotenv import load_dotenv
-from backend import ai_service
+
+# backend modules use flat imports (they run from inside backend/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+import ai_service
+from uploads import SpooledUpload
 
 # Load env for API key
 load_dotenv()
@@ -15,11 +20,13 @@ async def test_verification():
     img = Image.new('RGB', (100, 100), color = 'red')
     img_path = "test_image.jpg"
     img.save(img_path)
+    with open(img_path, "rb") as f:
+        upload = SpooledUpload.from_bytes(f.read(), "image/jpeg", img_path)
     
     try:
         # Test with a prompt that should FAIL (Red square is not a tree)
         print("Test 1: Verifying 'Red Square' against 'Tree' (Should be Invalid)")
-        result = await ai_service.verify_task_content(img_path, "image/jpeg", "tree")
+        result = await ai_service.verify_task_content(upload, "tree")
         print(f"Result: {result}")
         
         if result['is_valid']:
@@ -29,7 +36,7 @@ async def test_verification():
 
         # Test with a prompt involving the image content (Red Color)
         print("\nTest 2: Verifying 'Red Square' against 'Something Red' (Should be Valid)")
-        result = await ai_service.verify_task_content(img_path, "image/jpeg", "red color")
+        result = await ai_service.verify_task_content(upload, "red color")
         print(f"Result: {result}")
         
         if result['is_valid']: